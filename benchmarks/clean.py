@@ -0,0 +1,108 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from curry_company.data import DATASET_PATH, clean_code
+
+#==============================================
+# Funções
+#==============================================
+
+# Versão original do clean_code (antes da vetorização), mantida apenas como referência de comparação:
+def legacy_clean_code(df):
+    """ Essa função reproduz a limpeza original das páginas: sete filtros encadeados, strip coluna a coluna e
+        .apply linha a linha na coluna de tempo.
+
+        Input: Dataframe
+        Output: Dataframe
+    """
+    df = df.loc[df['Delivery_person_Ratings'] != 'NaN ', :]
+    df = df.loc[df['Weatherconditions'] != 'NaN ', :]
+    df = df.loc[df['Road_traffic_density'] != 'NaN ', :]
+    df = df.loc[df['multiple_deliveries'] != 'NaN ', :]
+    df = df.loc[df['Festival'] != 'NaN ', :]
+    df = df.loc[df['City'] != 'NaN ', :]
+    df = df.loc[df['Delivery_person_Age'] != 'NaN ', :].copy()
+
+    df['City'] = df['City'].str.strip()
+    df['Delivery_person_ID'] = df['Delivery_person_ID'].str.strip()
+    df['Road_traffic_density'] = df['Road_traffic_density'].str.strip()
+    df['Type_of_order'] = df['Type_of_order'].str.strip()
+    df['Type_of_vehicle'] = df['Type_of_vehicle'].str.strip()
+    df['Festival'] = df['Festival'].str.strip()
+    df['City'] = df['City'].str.strip()
+
+    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
+    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
+    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
+
+    df['Order_Date'] = pd.to_datetime(df['Order_Date'], format='%d-%m-%Y')
+
+    df['Time_taken(min)'] = df['Time_taken(min)'].apply(lambda x: x.split('(min)')[1])
+    df['Time_taken(min)'] = df['Time_taken(min)'].astype(int)
+
+    df = df.reset_index(drop=True)
+
+    return df
+
+# Função para medir o tempo e o pico de memória de uma função de limpeza:
+def measure(func, df, repeat):
+    """ Essa função executa a limpeza repeat vezes e devolve o melhor tempo e o pico de memória alocada (tracemalloc).
+
+        Input: função de limpeza, dataframe bruto, número de repetições
+        Output: (segundos, pico em MB, dataframe limpo)
+    """
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(df)
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+
+    return best, peak, result
+
+# Função principal do benchmark:
+def main():
+    """ Essa função replica o train.csv n vezes, roda as duas versões da limpeza e imprime linhas/segundo e pico de memória.
+        Também confere se as duas versões produzem o mesmo dataframe.
+
+        Uso: python -m benchmarks.clean [--path dataset/train.csv] [--replicate 10] [--repeat 3]
+    """
+    parser = argparse.ArgumentParser(description='Benchmark do clean_code.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--replicate', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df_raw = pd.concat([pd.read_csv(args.path)] * args.replicate, ignore_index=True)
+    rows = len(df_raw)
+
+    print(f'{rows} linhas ({args.replicate}x {args.path})')
+
+    results = {}
+
+    for name, func in [('legacy', legacy_clean_code), ('clean_code', clean_code)]:
+        seconds, peak, results[name] = measure(func, df_raw, args.repeat)
+
+        print(f'{name:>12}: {seconds:8.3f} s  {rows / seconds:12,.0f} linhas/s  pico {peak:8.1f} MB')
+
+    # As colunas distance e week_of_year não existiam na versão original e os tipos compactos são comparados nos tipos originais:
+    legacy = results['legacy']
+    result = results['clean_code'].drop(columns=['distance', 'week_of_year']).astype(legacy.dtypes.to_dict())
+
+    pd.testing.assert_frame_equal(legacy, result)
+
+    print('Resultados idênticos.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from haversine import haversine
+
+from curry_company.data import DATASET_PATH, clean_code
+from curry_company.geo import haversine_distance
+
+#==============================================
+# Funções
+#==============================================
+
+# Função principal do benchmark:
+def main():
+    """ Essa função compara o cálculo da distância linha a linha (df.apply + haversine) com o cálculo vetorizado
+        (haversine_distance), imprimindo o tempo de cada um e a maior diferença entre os resultados.
+        Termina com erro se a diferença passar da tolerância.
+
+        Uso: python -m benchmarks.distance [--path dataset/train.csv] [--replicate 1] [--tolerance 1e-9]
+    """
+    parser = argparse.ArgumentParser(description='Benchmark e conferência do cálculo de distância.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--replicate', type=int, default=1)
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    df = clean_code(pd.concat([pd.read_csv(args.path)] * args.replicate, ignore_index=True))
+    cols = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
+
+    start = time.perf_counter()
+    expected = df.loc[:, cols].apply(lambda x:
+                                     haversine((x['Restaurant_latitude'], x['Restaurant_longitude']),
+                                               (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1)
+    apply_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = haversine_distance(*(df[col] for col in cols))
+    vector_seconds = time.perf_counter() - start
+
+    max_diff = np.max(np.abs(result - expected.to_numpy()))
+
+    print(f'{len(df)} linhas')
+    print(f'{"apply":>12}: {apply_seconds:8.3f} s')
+    print(f'{"vetorizado":>12}: {vector_seconds:8.3f} s')
+    print(f'maior diferença: {max_diff:.3e} km')
+
+    if not max_diff <= args.tolerance:
+        raise SystemExit(f'Diferença acima da tolerância ({args.tolerance}).')
+
+if __name__ == '__main__':
+    main()
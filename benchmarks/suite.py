@@ -0,0 +1,255 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from benchmarks.synthetic import write_orders
+from curry_company import maps, metrics
+from curry_company.cube import build_cube
+from curry_company.data import build_cache, clean_code, clear_cache, load_data
+from curry_company.distinct import build_courier_sets
+from curry_company.profiles import courier_profiles
+
+#==============================================
+# Configurações
+#==============================================
+
+# Tamanhos padrão: o train.csv (~45 mil pedidos), 10x e 100x.
+SIZES = [45_000, 450_000, 4_500_000]
+
+# Pasta dos resultados (um JSON por commit):
+RESULTS_PATH = 'benchmarks/results'
+
+#==============================================
+# Funções
+#==============================================
+
+# Funções que reproduzem os gráficos das páginas (métrica + figura, sem o cache de agregações):
+def distance(cube):
+    """ Essa função reproduz o gráfico de distância média por cidade da página Restaurantes.
+
+        Input: cubo diário
+        Output: figura
+    """
+    metrics.avg_distance(cube)
+    df_aux = metrics.distance_by_city(cube)
+
+    return go.Figure(data=[go.Pie(labels=df_aux['City'], values=df_aux['distance'], pull=[0, 0.1, 0])])
+
+def top_delivers(df):
+    """ Essa função reproduz as tabelas dos entregadores mais rápidos e mais lentos da página Entregadores.
+
+        Input: dataframe limpo
+        Output: dicionário {'fastest': Dataframe, 'slowest': Dataframe}
+    """
+    return metrics.top_couriers(df, 10)
+
+def country_maps(df):
+    """ Essa função reproduz o mapa da página Empresa (HTML completo, como enviado ao navegador).
+
+        Input: dataframe limpo
+        Output: texto HTML
+    """
+    return maps.country_map_html(df)
+
+def order_share_by_week(couriers):
+    """ Essa função reproduz o gráfico de pedidos por entregador por semana da página Empresa.
+
+        Input: conjuntos de entregadores (ver curry_company.distinct)
+        Output: figura
+    """
+    df_aux = metrics.orders_per_courier_by_week(couriers)
+
+    return px.line(df_aux, x='week_of_year', y='order_by_deliver')
+
+def avg_std_time_on_traffic(cube):
+    """ Essa função reproduz o gráfico do tempo médio por cidade e tráfego da página Restaurantes.
+
+        Input: cubo diário
+        Output: figura
+    """
+    df_aux = metrics.time_stats(cube, (('City', 'Road_traffic_density'),))[('City', 'Road_traffic_density')].reset_index()
+
+    return px.sunburst(df_aux, path=['City', 'Road_traffic_density'], values='avg_time', color='std_time',
+                       color_continuous_scale='RdBu', color_continuous_midpoint=np.average(df_aux['std_time']))
+
+# Função para medir o tempo e o pico de memória de uma etapa:
+def measure(func, repeat):
+    """ Essa função executa a etapa repeat vezes e devolve o melhor tempo e o pico de memória alocada (tracemalloc)
+        numa execução extra, para que o rastreamento não afete o tempo.
+
+        Input: função sem argumentos, número de repetições
+        Output: (segundos, pico em MB, resultado da etapa)
+    """
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+
+    return best, peak, result
+
+# Função para medir todas as etapas com um tamanho de dataset:
+def run(rows, seed, repeat, directory):
+    """ Essa função gera o CSV sintético (ver benchmarks.synthetic) e mede, em ordem, cada etapa do dashboard:
+        - read_csv, clean_code: leitura e limpeza do CSV
+        - build_cache: leitura, limpeza e gravação do arquivo colunar (o que acontece quando o CSV muda)
+        - load_data: carga do arquivo colunar (o que acontece quando o processo começa)
+        - build_cube, build_courier_sets, courier_profiles: pré-agregados montados uma vez por carga
+        - distance, top_delivers, country_maps, order_share_by_week, avg_std_time_on_traffic: gráficos das páginas,
+          com a mesma entrada que as páginas usam (cubo, dataframe ou conjuntos de entregadores)
+
+        Input: rows, seed, repeat, pasta temporária
+        Output: lista de dicionários {'rows', 'stage', 'seconds', 'peak_mb'}
+    """
+    path = write_orders(os.path.join(directory, f'orders_{rows}.csv'), rows, seed)
+
+    results = []
+
+    def stage(name, func):
+        seconds, peak, result = measure(func, repeat)
+
+        results.append({'rows': rows, 'stage': name, 'seconds': seconds, 'peak_mb': peak})
+        print(f'{rows:>10} {name:>24}: {seconds:8.3f} s  pico {peak:8.1f} MB')
+
+        return result
+
+    def load():
+        clear_cache()
+        return load_data(path)
+
+    raw = stage('read_csv', lambda: pd.read_csv(path))
+    stage('clean_code', lambda: clean_code(raw))
+    del raw
+
+    stage('build_cache', lambda: build_cache(path))
+    df = stage('load_data', load)
+
+    cube = stage('build_cube', lambda: build_cube(df))
+    couriers = stage('build_courier_sets', lambda: build_courier_sets(df))
+    stage('courier_profiles', lambda: courier_profiles(df))
+
+    stage('distance', lambda: distance(cube))
+    stage('top_delivers', lambda: top_delivers(df))
+    stage('country_maps', lambda: country_maps(df))
+    stage('order_share_by_week', lambda: order_share_by_week(couriers))
+    stage('avg_std_time_on_traffic', lambda: avg_std_time_on_traffic(cube))
+
+    clear_cache()
+
+    return results
+
+# Função para identificar o commit medido:
+def git_commit():
+    """ Essa função devolve o hash do commit atual, com o sufixo -dirty se houver alterações não commitadas,
+        ou None fora de um repositório git.
+
+        Output: texto ou None
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return commit + ('-dirty' if status.strip() else '')
+
+# Função para comparar os resultados com os de outro commit:
+def compare(results, baseline, tolerance):
+    """ Essa função compara o tempo de cada etapa com o da mesma etapa e tamanho num arquivo de resultados anterior
+        e imprime a razão. Etapas mais lentas que (1 + tolerance) vezes a referência são marcadas como regressão.
+
+        Input: lista de resultados, dicionário lido do JSON de referência, tolerance (ex.: 0.2 para 20%)
+        Output: quantidade de regressões
+    """
+    reference = {(r['rows'], r['stage']): r for r in baseline['results']}
+    regressions = 0
+
+    print(f'\nComparação com {baseline.get("commit")}:')
+
+    for result in results:
+        before = reference.get((result['rows'], result['stage']))
+
+        if before is None:
+            continue
+
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        slower = ratio > 1 + tolerance
+        regressions += slower
+
+        print(f'{result["rows"]:>10} {result["stage"]:>24}: {ratio:6.2f}x tempo  '
+              f'{result["peak_mb"] - before["peak_mb"]:+8.1f} MB{"  REGRESSÃO" if slower else ""}')
+
+    return regressions
+
+# Função principal do benchmark:
+def main():
+    """ Essa função mede carga, limpeza e gráficos com datasets sintéticos de cada tamanho e grava os resultados em JSON
+        (por padrão, benchmarks/results/<commit>.json). Com --baseline, compara com os resultados de outro commit e
+        termina com erro se alguma etapa ficou mais lenta que a tolerância.
+
+        Uso: python -m benchmarks.suite [--sizes 45000 450000 4500000] [--repeat 3] [--seed 0]
+                                        [--output arquivo.json] [--baseline arquivo.json] [--tolerance 0.2]
+    """
+    parser = argparse.ArgumentParser(description='Benchmark de carga, limpeza e gráficos com dados sintéticos.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            results += run(rows, args.seed, args.repeat, directory)
+
+    report = {'commit': commit,
+              'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'pandas': pd.__version__,
+              'numpy': np.__version__,
+              'seed': args.seed,
+              'repeat': args.repeat,
+              'results': results}
+
+    output = args.output or os.path.join(RESULTS_PATH, f'{(commit or "local")[:12]}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    print(f'\nResultados gravados em {output}.')
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        if compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+#==============================================
+# Configurações
+#==============================================
+
+# Linhas geradas por lote. Cada lote tem o seu próprio gerador aleatório (semente + número do lote), então o arquivo
+# depende só da semente e da quantidade de linhas.
+CHUNKSIZE = 100_000
+
+# Cidades dos entregadores (prefixo do Delivery_person_ID) e o centro de cada uma (latitude, longitude):
+CITY_CENTERS = {'INDO': (22.72, 75.86), 'BANG': (12.97, 77.59), 'COIMB': (11.02, 76.96), 'CHEN': (13.08, 80.27),
+                'HYD': (17.39, 78.49), 'RANCHI': (23.34, 85.31), 'MYS': (12.30, 76.64), 'DEH': (30.32, 78.03),
+                'KOC': (9.93, 76.27), 'PUNE': (18.52, 73.86), 'LUDH': (30.90, 75.86), 'KNP': (26.45, 80.33),
+                'MUM': (19.08, 72.88), 'KOL': (22.57, 88.36), 'JAP': (26.91, 75.79), 'SUR': (21.17, 72.83),
+                'GOA': (15.49, 73.83), 'AURG': (19.88, 75.34), 'AGR': (27.18, 78.01), 'VAD': (22.31, 73.18),
+                'ALH': (25.44, 81.85), 'BHP': (23.26, 77.41)}
+
+# Restaurantes por cidade e entregadores por restaurante no train.csv (22 x 20 x 3 = 1320 entregadores em ~45 mil pedidos).
+# Com mais pedidos, a quantidade de restaurantes cresce na mesma proporção.
+RESTAURANTS = 20
+COURIERS_PER_RESTAURANT = 3
+REFERENCE_ROWS = 45_593
+
+# Distribuições das colunas categóricas, aproximadas do train.csv (valores com o espaço no fim, como no arquivo):
+CITY = {'Metropolitian ': 0.746, 'Urban ': 0.223, 'Semi-Urban ': 0.004, 'NaN ': 0.027}
+TRAFFIC = {'Low ': 0.338, 'Jam ': 0.312, 'Medium ': 0.241, 'High ': 0.096, 'NaN ': 0.013}
+FESTIVAL = {'No ': 0.975, 'Yes ': 0.020, 'NaN ': 0.005}
+WEATHER = {'conditions Fog': 0.168, 'conditions Stormy': 0.166, 'conditions Cloudy': 0.166,
+           'conditions Sandstorms': 0.164, 'conditions Windy': 0.164, 'conditions Sunny': 0.159, 'conditions NaN': 0.013}
+ORDER_TYPE = {'Snack ': 0.252, 'Meal ': 0.250, 'Drinks ': 0.249, 'Buffet ': 0.249}
+VEHICLE = {'motorcycle ': 0.583, 'scooter ': 0.334, 'electric_scooter ': 0.082, 'bicycle ': 0.001}
+VEHICLE_CONDITION = {0: 0.329, 1: 0.330, 2: 0.330, 3: 0.011}
+MULTIPLE_DELIVERIES = {'1': 0.620, '0': 0.310, '2': 0.044, '3': 0.004, 'NaN ': 0.022}
+
+# Fração de pedidos sem idade e avaliação do entregador ('NaN ' nas duas colunas) e sem horário do pedido:
+MISSING_PROFILE = 0.04
+MISSING_ORDER_TIME = 0.038
+
+# Fração de pedidos com as coordenadas do restaurante zeradas ou com o sinal trocado (erros de digitação do train.csv):
+ZERO_COORDINATES = 0.08
+NEGATIVE_COORDINATES = 0.01
+
+# Efeito de cada condição no tempo de entrega (minutos somados a BASE_TIME), aproximado das médias do train.csv:
+BASE_TIME = 15.0
+TRAFFIC_TIME = {'Low ': 0.0, 'Medium ': 5.5, 'High ': 6.0, 'Jam ': 10.0, 'NaN ': 5.0}
+CITY_TIME = {'Metropolitian ': 3.0, 'Urban ': -1.0, 'Semi-Urban ': 21.0, 'NaN ': 2.0}
+WEATHER_TIME = {'conditions Sunny': -4.0, 'conditions Stormy': 1.0, 'conditions Cloudy': 3.0, 'conditions Fog': 3.0,
+                'conditions Windy': 0.0, 'conditions Sandstorms': 1.0, 'conditions NaN': 0.0}
+FESTIVAL_TIME = {'No ': 0.0, 'Yes ': 19.0, 'NaN ': 0.0}
+MULTIPLE_DELIVERIES_TIME = 4.0
+
+# Dias com pedidos no train.csv:
+DATES = pd.DatetimeIndex(list(pd.date_range('2022-02-11', '2022-02-18')) + list(pd.date_range('2022-03-01', '2022-04-06')))
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para sortear valores de uma distribuição:
+def choice(rng, distribution, size):
+    """ Essa função sorteia size valores de uma distribuição dada como dicionário {valor: probabilidade}.
+
+        Input: gerador aleatório, dicionário, quantidade
+        Output: array com os valores sorteados
+    """
+    values = np.array(list(distribution), dtype=object)
+    p = np.array(list(distribution.values()), dtype='float64')
+
+    return values[rng.choice(len(values), size, p=p / p.sum())]
+
+# Função para mapear valores de texto em números:
+def lookup(values, table):
+    """ Essa função troca cada valor pelo número correspondente no dicionário (ex.: minutos a mais por condição de trânsito).
+
+        Input: array de valores, dicionário {valor: número}
+        Output: array float64
+    """
+    return pd.Series(values).map(table).to_numpy(dtype='float64')
+
+# Função para montar a tabela de restaurantes e entregadores:
+def couriers(rows, seed=0):
+    """ Essa função monta os entregadores da geração: cada cidade de CITY_CENTERS tem restaurantes com uma localização
+        fixa perto do centro da cidade, e cada restaurante tem COURIERS_PER_RESTAURANT entregadores
+        (ID no formato do train.csv, ex.: 'BANGRES15DEL02 '). A quantidade de restaurantes cresce com rows.
+
+        Input: rows (quantidade total de pedidos), seed
+        Output: Dataframe com Delivery_person_ID, Restaurant_latitude e Restaurant_longitude (uma linha por entregador)
+    """
+    rng = np.random.default_rng([seed, 0])
+    restaurants = max(RESTAURANTS, int(np.ceil(RESTAURANTS * rows / REFERENCE_ROWS)))
+
+    codes = np.repeat(list(CITY_CENTERS), restaurants * COURIERS_PER_RESTAURANT)
+    centers = np.array([CITY_CENTERS[code] for code in codes])
+    restaurant = np.tile(np.repeat(np.arange(1, restaurants + 1), COURIERS_PER_RESTAURANT), len(CITY_CENTERS))
+    courier = np.tile(np.arange(1, COURIERS_PER_RESTAURANT + 1), len(CITY_CENTERS) * restaurants)
+
+    # Os entregadores de um mesmo restaurante saem do mesmo ponto:
+    offsets = np.repeat(rng.uniform(-0.1, 0.1, (len(codes) // COURIERS_PER_RESTAURANT, 2)), COURIERS_PER_RESTAURANT, axis=0)
+
+    return pd.DataFrame({'Delivery_person_ID': [f'{c}RES{r}DEL{d:02d} ' for c, r, d in zip(codes, restaurant, courier)],
+                         'Restaurant_latitude': np.round(centers[:, 0] + offsets[:, 0], 6),
+                         'Restaurant_longitude': np.round(centers[:, 1] + offsets[:, 1], 6)})
+
+# Função para gerar um lote de pedidos sintéticos:
+def generate_chunk(people, start, rows, seed=0):
+    """ Essa função gera rows pedidos sintéticos a partir do pedido número start, com as colunas e os formatos sujos do
+        train.csv que o clean_code espera: 'NaN ' nas colunas com valores faltando, espaço no fim dos textos, datas
+        dd-mm-aaaa, horários hh:mm:ss e tempo '(min) NN'.
+
+        O tempo de entrega depende do trânsito, da cidade, do clima, do festival e das entregas múltiplas, de forma que
+        os gráficos mostram as mesmas tendências do dataset real.
+
+        Input: people (tabela de couriers), start, rows, seed
+        Output: Dataframe bruto, como lido do CSV
+    """
+    rng = np.random.default_rng([seed, 1 + start // CHUNKSIZE])
+
+    person = people.iloc[rng.integers(0, len(people), rows)]
+
+    city = choice(rng, CITY, rows)
+    traffic = choice(rng, TRAFFIC, rows)
+    festival = choice(rng, FESTIVAL, rows)
+    weather = choice(rng, WEATHER, rows)
+    multiple = choice(rng, MULTIPLE_DELIVERIES, rows)
+
+    # Idade e avaliação: faltam juntas, e as avaliações se concentram entre 4.5 e 5:
+    missing = rng.random(rows) < MISSING_PROFILE
+    age = np.where(missing, 'NaN ', rng.integers(20, 40, rows).astype(str)).astype(object)
+    rating = np.clip(np.round(5.0 - rng.gamma(1.2, 0.3, rows), 1), 1.0, 5.0)
+    rating = np.where(missing, 'NaN ', rating.astype(str)).astype(object)
+
+    # Coordenadas: a do restaurante vem do entregador, com os erros do train.csv (zeradas ou com o sinal trocado);
+    # a entrega fica a até ~0.09 grau do restaurante (perto de 0, como no train.csv, quando o restaurante está zerado).
+    restaurant_latitude = person['Restaurant_latitude'].to_numpy().copy()
+    restaurant_longitude = person['Restaurant_longitude'].to_numpy().copy()
+
+    error = rng.random(rows)
+    zero = error < ZERO_COORDINATES
+    negative = (error >= ZERO_COORDINATES) & (error < ZERO_COORDINATES + NEGATIVE_COORDINATES)
+
+    restaurant_latitude[zero] = 0.0
+    restaurant_longitude[zero] = 0.0
+    restaurant_latitude[negative] *= -1
+    restaurant_longitude[negative] *= -1
+
+    delivery_latitude = np.round(np.abs(restaurant_latitude) + rng.uniform(0.01, 0.09, rows) * rng.choice([-1, 1], rows), 6)
+    delivery_longitude = np.round(np.abs(restaurant_longitude) + rng.uniform(0.01, 0.09, rows) * rng.choice([-1, 1], rows), 6)
+
+    # Horário do pedido (de 5 em 5 minutos) e da retirada (5, 10 ou 15 minutos depois):
+    ordered = rng.integers(8 * 12, 24 * 12, rows) * 5
+    picked = (ordered + rng.choice([5, 10, 15], rows)) % (24 * 60)
+    time_ordered = pd.to_datetime(ordered, unit='m').strftime('%H:%M:%S').to_numpy(dtype=object)
+    time_ordered[rng.random(rows) < MISSING_ORDER_TIME] = 'NaN '
+
+    # Tempo de entrega:
+    minutes = (BASE_TIME
+               + lookup(traffic, TRAFFIC_TIME) + lookup(city, CITY_TIME) + lookup(weather, WEATHER_TIME)
+               + lookup(festival, FESTIVAL_TIME)
+               + MULTIPLE_DELIVERIES_TIME * pd.to_numeric(pd.Series(multiple), errors='coerce').fillna(1).to_numpy()
+               + rng.normal(0, 6, rows))
+    minutes = np.clip(np.round(minutes), 10, 54).astype(int)
+
+    return pd.DataFrame({
+        'ID': [f'0x{i:04x} ' for i in range(start, start + rows)],
+        'Delivery_person_ID': person['Delivery_person_ID'].to_numpy(),
+        'Delivery_person_Age': age,
+        'Delivery_person_Ratings': rating,
+        'Restaurant_latitude': restaurant_latitude,
+        'Restaurant_longitude': restaurant_longitude,
+        'Delivery_location_latitude': delivery_latitude,
+        'Delivery_location_longitude': delivery_longitude,
+        'Order_Date': DATES[rng.integers(0, len(DATES), rows)].strftime('%d-%m-%Y'),
+        'Time_Orderd': time_ordered,
+        'Time_Order_picked': pd.to_datetime(picked, unit='m').strftime('%H:%M:%S'),
+        'Weatherconditions': weather,
+        'Road_traffic_density': traffic,
+        'Vehicle_condition': choice(rng, VEHICLE_CONDITION, rows).astype(int),
+        'Type_of_order': choice(rng, ORDER_TYPE, rows),
+        'Type_of_vehicle': choice(rng, VEHICLE, rows),
+        'multiple_deliveries': multiple,
+        'Festival': festival,
+        'City': city,
+        'Time_taken(min)': np.char.add('(min) ', minutes.astype(str)).astype(object),
+    })
+
+# Função para gerar os pedidos sintéticos em lotes:
+def generate(rows, seed=0):
+    """ Essa função gera rows pedidos sintéticos em lotes de CHUNKSIZE linhas (ver generate_chunk).
+        Só um lote fica em memória por vez.
+
+        Input: rows, seed
+        Output: gerador de dataframes brutos
+    """
+    people = couriers(rows, seed)
+
+    for start in range(0, rows, CHUNKSIZE):
+        yield generate_chunk(people, start, min(CHUNKSIZE, rows - start), seed)
+
+# Função para gravar os pedidos sintéticos num CSV:
+def write_orders(path, rows, seed=0):
+    """ Essa função grava rows pedidos sintéticos no CSV, lote a lote, no mesmo formato do train.csv.
+        A mesma semente e a mesma quantidade de linhas geram sempre o mesmo arquivo. A pasta do CSV é criada se não existir.
+
+        Input: caminho do CSV, rows, seed
+        Output: caminho do CSV
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    for i, chunk in enumerate(generate(rows, seed)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+
+    return path
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função grava um CSV com pedidos sintéticos no formato do train.csv.
+
+        Uso: python -m benchmarks.synthetic --rows 4500000 [--seed 0] [--output dataset/synthetic.csv]
+    """
+    parser = argparse.ArgumentParser(description='Gera pedidos sintéticos no formato do train.csv.')
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='dataset/synthetic.csv')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    write_orders(args.output, args.rows, args.seed)
+
+    print(f'{args.rows} pedidos gravados em {args.output} ({os.path.getsize(args.output) / 1024**2:.1f} MB, '
+          f'{time.perf_counter() - start:.1f} s).')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+""" Camada compartilhada de dados e métricas do dashboard da Curry Company.
+
+    Os scripts das páginas (pasta pages/) importam daqui em vez de manter
+    cópias próprias da leitura e da limpeza do dataset.
+"""
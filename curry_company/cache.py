@@ -0,0 +1,178 @@
+#==============================================
+# Libraries
+#==============================================
+import sys
+import threading
+from collections import OrderedDict
+
+from curry_company import profiling
+
+#==============================================
+# Classes
+#==============================================
+
+class LRUCache:
+    """ Cache em memória com limite de entradas e descarte da entrada usada há mais tempo (LRU).
+        Opcionalmente, tem também um limite de memória (maxbytes): o tamanho de cada valor é medido por sizeof ao
+        guardar e as entradas mais antigas são descartadas enquanto a soma passar do limite (a mais nova é sempre mantida).
+        É compartilhado por todas as sessões do processo do Streamlit e seguro para uso entre threads.
+        Conta acertos (hits), faltas (misses) e descartes (evictions) para medir a taxa de acerto.
+
+        Os valores guardados são devolvidos sem cópia: quem recebe um resultado do cache não deve alterá-lo.
+    """
+
+    def __init__(self, maxsize=256, maxbytes=None, sizeof=sys.getsizeof):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """ Essa função devolve o valor guardado para key ou, se ele não existir, executa compute(), guarda e devolve
+            o resultado. O cálculo roda fora do lock, então uma falta não bloqueia as outras sessões.
+
+            Input: chave (hashable), função sem argumentos que calcula o valor
+            Output: valor
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+            self.misses += 1
+
+        value = compute()
+
+        self.put(key, value)
+
+        return value
+
+    def peek(self, key):
+        """ Essa função devolve o valor guardado para key, ou None, sem calcular nada e sem alterar os contadores
+            nem a ordem de descarte.
+
+            Input: chave (hashable)
+            Output: valor ou None
+        """
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key, value):
+        """ Essa função guarda value em key, substituindo o valor anterior, e descarta as entradas mais antigas
+            se o limite de entradas ou o de memória for ultrapassado.
+
+            Input: chave (hashable), valor
+        """
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+
+        with self._lock:
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+
+            self._data[key] = value
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes
+                                                     and len(self._data) > 1):
+                oldest, _ = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(oldest)
+                self.evictions += 1
+
+    def info(self):
+        """ Essa função devolve os contadores do cache.
+
+            Output: dicionário com hits, misses, evictions, hit_rate, size, maxsize, nbytes e maxbytes
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / requests if requests else 0.0,
+                    'size': len(self._data),
+                    'maxsize': self.maxsize,
+                    'nbytes': self.nbytes,
+                    'maxbytes': self.maxbytes}
+
+    def clear(self):
+        """ Essa função descarta todas as entradas e zera os contadores.
+        """
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para estimar a memória ocupada por um gráfico:
+def figure_nbytes(fig):
+    """ Essa função estima a memória ocupada por uma figura do plotly pelo tamanho do JSON dela (o sys.getsizeof mede
+        só o objeto da figura, sem os dados). Só é chamada quando a figura é guardada no cache.
+
+        Input: figura do plotly
+        Output: quantidade de bytes
+    """
+    import plotly.io as pio
+
+    return len(pio.to_json(fig, validate=False))
+
+# Função para obter os dados de uma agregação:
+def resolve(df):
+    """ Essa função devolve os dados recebidos ou, se for uma função sem argumentos (ver data.lazy_orders), o resultado
+        dela. Os dataframes, os pré-agregados e as seleções do banco local não são chamáveis.
+
+        Input: dados ou função sem argumentos que os devolve
+        Output: dados
+    """
+    return df() if callable(df) else df
+
+# Função para obter uma agregação pelo cache:
+def cached(func, df, state, *args):
+    """ Essa função devolve func(df, *args) a partir do cache de agregações.
+        A chave é formada pelo nome da função, pelo estado normalizado dos filtros (ver data.filter_state) e pelos
+        demais argumentos. Como o dataframe filtrado é determinado pelo estado dos filtros, ele não entra na chave:
+        duas sessões com os mesmos filtros recebem o mesmo resultado sem recalcular. df também pode ser uma função sem
+        argumentos que devolve o dataframe (ver data.lazy_orders), chamada só numa falta.
+        Com o perfil de desempenho ligado, cada chamada aparece como uma etapa com o nome da função (ver profiling).
+
+        Input:
+            - func: função de agregação (ver metrics)
+            - df: dataframe filtrado (ou função que o devolve)
+            - state: estado normalizado dos filtros
+            - args: argumentos adicionais de func (precisam ser hashable)
+        Output: resultado de func
+    """
+    key = (func.__module__, func.__qualname__, state, args)
+
+    with profiling.stage(func.__qualname__):
+        return AGGREGATIONS.get_or_compute(key, lambda: func(resolve(df), *args))
+
+#==============================================
+# Configurações
+#==============================================
+
+# Cache das agregações das páginas, compartilhado por todas as sessões:
+AGGREGATIONS = LRUCache(maxsize=256)
+
+# Estruturas derivadas do dataset inteiro (ex.: o cubo diário), uma por versão do arquivo de dados:
+RESOURCES = LRUCache(maxsize=8)
+
+# Gráficos já montados (figuras do plotly, ver figures), limitados pela memória ocupada:
+FIGURES = LRUCache(maxsize=1024, maxbytes=64 * 1024**2, sizeof=figure_nbytes)
+
+# HTML dos mapas da Visão Geográfica (ver maps.map_html), que cresce com a quantidade de restaurantes e de células da
+# grade (cerca de 0,5 MB com 45 mil pedidos), limitado pela memória ocupada:
+MAPS = LRUCache(maxsize=256, maxbytes=64 * 1024**2)
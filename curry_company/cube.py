@@ -0,0 +1,193 @@
+#==============================================
+# Libraries
+#==============================================
+import numpy as np
+import pandas as pd
+
+from curry_company import sql
+from curry_company.cache import RESOURCES
+from curry_company.data import DATASET_PATH, concat_clean, dataset_key, freeze, load_data
+
+#==============================================
+# Configurações
+#==============================================
+
+# Granularidade do cubo: uma linha por combinação observada de dia x cidade x tráfego x festival x tipo de pedido x clima.
+# A semana do ano depende só do dia, então também fica no cubo sem aumentar a quantidade de linhas.
+DIMENSIONS = ['Order_Date', 'week_of_year', 'City', 'Road_traffic_density', 'Festival', 'Type_of_order', 'Weatherconditions']
+
+# Colunas numéricas resumidas no cubo por soma e soma dos quadrados (a contagem fica na coluna orders):
+MEASURES = ['Time_taken(min)', 'Delivery_person_Ratings', 'distance']
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para montar o cubo diário:
+def build_cube(df):
+    """ Essa função resume o dataframe limpo no cubo diário: para cada combinação observada de DIMENSIONS, guarda a
+        quantidade de pedidos (orders) e, para cada coluna de MEASURES, a soma (<coluna>_sum) e a soma dos quadrados
+        (<coluna>_sumsq). Com esses três valores é possível obter contagem, média e desvio padrão de qualquer
+        agrupamento por um subconjunto das dimensões, somando as linhas do cubo (ver count_by e stats_by).
+        Os valores são convertidos para float64 antes das somas, pois as colunas inteiras do schema compacto são reduzidas (ex.: int8).
+
+        Input: Dataframe limpo
+        Output: Dataframe do cubo (dimensões como colunas)
+    """
+    columns = {'orders': np.ones(len(df), dtype='int64')}
+
+    for col in MEASURES:
+        values = df[col].to_numpy(dtype='float64')
+        columns[f'{col}_sum'] = values
+        columns[f'{col}_sumsq'] = values ** 2
+
+    cube = (pd.DataFrame(columns, index=df.index)
+              .groupby([df[col] for col in DIMENSIONS], observed=True)
+              .sum()
+              .reset_index())
+
+    return cube
+
+# Função para carregar o cubo do dataset:
+def load_cube(path=DATASET_PATH):
+    """ Essa função devolve o cubo diário do dataset, montado uma única vez por versão do dataset e compartilhado
+        por todas as sessões do processo (somente leitura, como o dataframe de load_data). Com a ingestão em lotes
+        ligada (ver ingest.enabled), vem dos resumos dos lotes do CSV, sem carregar os pedidos.
+
+        Input: caminho do CSV (padrão: dataset/train.csv)
+        Output: Dataframe do cubo
+    """
+    # Importado aqui porque o ingest usa este módulo:
+    from curry_company import ingest
+
+    if ingest.enabled():
+        return ingest.load_aggregates(path)['cube']
+
+    df = load_data(path)
+
+    return RESOURCES.get_or_compute(('cube', dataset_key(path)), lambda: freeze(build_cube(df)))
+
+# Função para atualizar o cubo depois da chegada de novos pedidos:
+def update_cube(cube, df, days):
+    """ Essa função atualiza o cubo recalculando apenas os dias afetados por novos pedidos: as linhas desses dias
+        são descartadas e montadas de novo a partir dos pedidos desses dias no dataframe atualizado; as demais
+        linhas do cubo são mantidas. As semanas são derivadas dos dias, então também ficam atualizadas.
+
+        Input:
+            - cube: cubo anterior
+            - df: dataframe limpo já com os novos pedidos
+            - days: datas (Order_Date) dos novos pedidos
+        Output: Dataframe do cubo atualizado
+    """
+    days = pd.DatetimeIndex(days).unique()
+
+    kept = cube.loc[~cube['Order_Date'].isin(days), :]
+    rebuilt = build_cube(df.loc[df['Order_Date'].isin(days), :])
+
+    return concat_clean([kept, rebuilt])
+
+# Função para verificar se um dataframe é o cubo:
+def is_cube(frame):
+    """ Essa função verifica se o dataframe recebido é o cubo (tem a coluna orders) ou o dataframe de pedidos.
+
+        Input: Dataframe
+        Output: True ou False
+    """
+    return 'orders' in frame.columns
+
+# Função para contar pedidos por um agrupamento:
+def count_by(frame, by):
+    """ Essa função conta os pedidos agrupando por by. Funciona tanto com o dataframe de pedidos (conta as linhas)
+        quanto com o cubo (soma a coluna orders).
+
+        Input:
+            - frame: dataframe de pedidos ou cubo (filtrado ou não)
+            - by: lista de colunas (ou Series nomeadas) de agrupamento
+        Output: Dataframe com as colunas de agrupamento e a coluna ID (quantidade de pedidos)
+    """
+    if sql.is_orders(frame):
+        return sql.count_by(frame, by)
+
+    if is_cube(frame):
+        df_aux = frame.groupby(by, observed=True)['orders'].sum()
+    else:
+        df_aux = frame.groupby(by, observed=True).size()
+
+    return df_aux.rename('ID').reset_index()
+
+# Função para calcular contagem, média e desvio padrão por um agrupamento:
+def stats_by(frame, by, col):
+    """ Essa função calcula a contagem (count), a média (mean) e o desvio padrão amostral (std) da coluna col
+        agrupando por by. Com o dataframe de pedidos, usa o groupby do pandas; com o cubo, soma as colunas de
+        contagem, soma e soma dos quadrados das linhas de cada grupo e calcula:
+            mean = soma / n
+            std = raiz((soma dos quadrados - soma * mean) / (n - 1)), indefinido (NaN) para n < 2.
+        Com by vazio, o resultado tem uma única linha com o total.
+        Com uma seleção do banco local (ver sql.Orders), as somas vêm de uma consulta de agregação.
+
+        Input:
+            - frame: dataframe de pedidos ou cubo (filtrado ou não)
+            - by: lista de colunas de agrupamento (pode ser vazia)
+            - col: coluna numérica (uma das MEASURES, no caso do cubo)
+        Output: Dataframe com as colunas de agrupamento, count, mean e std
+    """
+    by = list(by)
+
+    if sql.is_orders(frame):
+        frame = sql.group_sums(frame, by, col)
+
+    if not is_cube(frame):
+        if not by:
+            return frame[col].agg(['count', 'mean', 'std']).to_frame().T.reset_index(drop=True)
+
+        return frame.groupby(by, observed=True)[col].agg(['count', 'mean', 'std']).reset_index()
+
+    columns = ['orders', f'{col}_sum', f'{col}_sumsq']
+
+    if by:
+        sums = frame.groupby(by, observed=True)[columns].sum()
+    else:
+        sums = frame[columns].sum().to_frame().T
+
+    n = sums['orders']
+    mean = sums[f'{col}_sum'] / n
+    var = (sums[f'{col}_sumsq'] - sums[f'{col}_sum'] * mean) / (n - 1)
+
+    df_aux = pd.DataFrame({'count': n,
+                           'mean': mean,
+                           'std': np.sqrt(var.clip(lower=0)).where(n > 1)})
+
+    return df_aux.reset_index(drop=not by)
+
+# Função para calcular contagem, média e desvio padrão de vários agrupamentos numa única passada:
+def grouped_stats(frame, col, dims):
+    """ Essa função calcula contagem, média e desvio padrão da coluna col para vários agrupamentos de uma vez.
+        Em vez de um groupby por agrupamento, faz um único groupby pela união das colunas de todos os agrupamentos
+        (contagem, soma e soma dos quadrados) e obtém cada agrupamento pedido somando as linhas desse resultado,
+        que é pequeno (ver stats_by). Funciona com o dataframe de pedidos, com o cubo ou com uma seleção do banco local.
+
+        Exemplo: grouped_stats(cube, 'Time_taken(min)', [('Festival',), ('City', 'Road_traffic_density')])
+
+        Input:
+            - frame: dataframe de pedidos ou cubo (filtrado ou não)
+            - col: coluna numérica (uma das MEASURES, no caso do cubo)
+            - dims: lista de tuplas com as colunas de cada agrupamento
+        Output: dicionário {tupla do agrupamento: Dataframe indexado pelas colunas do agrupamento, com count, mean e std}
+    """
+    dims = [tuple(d) for d in dims]
+    union = list(dict.fromkeys(c for d in dims for c in d))
+    columns = ['orders', f'{col}_sum', f'{col}_sumsq']
+
+    # Única passada sobre os dados: resumo na granularidade da união dos agrupamentos.
+    if sql.is_orders(frame):
+        base = sql.group_sums(frame, union, col)
+    elif is_cube(frame):
+        base = frame.groupby(union, observed=True)[columns].sum().reset_index()
+    else:
+        values = frame[col].to_numpy(dtype='float64')
+        base = (pd.DataFrame(dict(zip(columns, [np.ones(len(frame), dtype='int64'), values, values ** 2])), index=frame.index)
+                  .groupby([frame[c] for c in union], observed=True)
+                  .sum()
+                  .reset_index())
+
+    return {d: stats_by(base, d, col).set_index(list(d)) for d in dims}
@@ -0,0 +1,493 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import functools
+import glob
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from curry_company import geo, profiling, schema, store
+
+#==============================================
+# Configurações
+#==============================================
+DATASET_PATH = 'dataset/train.csv'
+
+# Período das partições por Order_Date (ver load_orders): 'day' ou 'week'.
+PARTITION_GRANULARITY = 'week'
+
+# Colunas em que o valor ausente aparece como o texto 'NaN ':
+NAN_COLUMNS = ['Delivery_person_Ratings', 'Weatherconditions', 'Road_traffic_density', 'multiple_deliveries',
+               'Festival', 'City', 'Delivery_person_Age']
+
+# Conversão de cada coluna de texto: remoção dos espaços, tipo numérico, data e limpeza do tempo.
+# As funções recebem uma Series com os valores distintos da coluna (ver map_unique).
+PARSERS = {'City': lambda s: s.str.strip(),
+           'Delivery_person_ID': lambda s: s.str.strip(),
+           'Road_traffic_density': lambda s: s.str.strip(),
+           'Type_of_order': lambda s: s.str.strip(),
+           'Type_of_vehicle': lambda s: s.str.strip(),
+           'Festival': lambda s: s.str.strip(),
+           'Delivery_person_Age': lambda s: s.astype(int),
+           'Delivery_person_Ratings': lambda s: s.astype(float),
+           'multiple_deliveries': lambda s: s.astype(int),
+           'Order_Date': lambda s: pd.to_datetime(s, format='%d-%m-%Y'),
+           'Time_taken(min)': lambda s: s.str.split('(min)', n=1, regex=False).str[1].astype(int)}
+
+# Cache do processo: um dataframe limpo por arquivo, válido enquanto a chave (caminho, mtime, tamanho) não mudar.
+_cache = {}
+_cache_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'load_time': 0.0, 'last_load_time': 0.0}
+
+# Evita que duas sessões do mesmo processo gerem as partições ao mesmo tempo (ver load_orders):
+_partition_lock = threading.Lock()
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para aplicar uma transformação apenas nos valores distintos de uma coluna:
+def map_unique(values, func, categorical=False):
+    """ Essa função aplica func apenas sobre os valores distintos da coluna e espalha o resultado de volta para todas as linhas.
+        As colunas do dataset têm poucos valores distintos (cidades, tipos de tráfego, idades, datas, tempos), então as
+        operações .str e as conversões de tipo rodam sobre dezenas de valores em vez de sobre todas as linhas.
+        Com categorical=True, o resultado já sai como categoria, reaproveitando os códigos calculados aqui em vez
+        de fatorar a coluna de novo.
+
+        Input:
+            - values: array ou Series com os valores da coluna
+            - func: função que recebe e devolve uma Series (ex.: lambda s: s.str.strip())
+            - categorical: True para devolver uma categoria (categorias em ordem alfabética)
+        Output: array (ou Categorical) com o resultado para cada linha
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+
+    result = func(pd.Series(uniques))
+
+    if categorical:
+        # Valores que ficaram iguais depois da transformação (ex.: 'Urban' e 'Urban ') passam a ter o mesmo código:
+        new_codes, categories = pd.factorize(result, sort=True)
+
+        return pd.Categorical.from_codes(new_codes[codes], categories=categories)
+
+    return result.to_numpy()[codes]
+
+# Função para calcular a semana do ano de cada data:
+def week_of_year(dates):
+    """ Essa função calcula a semana do ano de cada data, com a mesma regra de strftime('%U'): as semanas começam no
+        domingo e os dias antes do primeiro domingo do ano ficam na semana 0. A conta é feita com inteiros sobre o dia
+        do ano e o dia da semana, sem formatar cada data como texto:
+            semana = (dia do ano - 1 + 7 - dias desde domingo) // 7
+
+        Input: Series de datas
+        Output: array de inteiros
+    """
+    dates = pd.Series(dates)
+
+    days_since_sunday = (dates.dt.dayofweek.to_numpy() + 1) % 7
+
+    return (dates.dt.dayofyear.to_numpy() - 1 + 7 - days_since_sunday) // 7
+
+# Função para limpar o dataframe:
+def clean_code(df, compact=True):
+    """ Essa função tem a responsabilidade de limpar o dataframe.
+
+        Tipos de limpeza:
+        1. Remoção dos NaN
+        2. Remoção dos espaços das variáveis de texto
+        3. Mudança do tipo da coluna de dados
+        4. Formatação da coluna de datas
+        5. Limpeza da coluna de tempo (remoção do texto da variável numérica)
+        6. Criação da coluna distance (km entre o restaurante e o local de entrega)
+        7. Criação da coluna week_of_year (semana do ano de Order_Date, ver week_of_year)
+
+        As linhas com 'NaN ' são eliminadas com uma única máscara e cada coluna é copiada uma única vez.
+        As conversões de PARSERS (strip, números, data e tempo) são feitas com operações vetorizadas sobre os valores
+        distintos de cada coluna, já com o tipo final.
+
+        Também foi resetado o index.
+
+        Por fim, as colunas são convertidas para o schema compacto (categorias e números reduzidos, ver schema.SCHEMA).
+
+        Imput: Dataframe
+            - compact: se False, mantém os tipos largos (object, int64, float64), usado no relatório de memória
+        Output: Dataframe
+    """
+
+    # Eliminando 'NaN ' com uma única máscara (colunas já lidas como número não têm o texto 'NaN '):
+    keep = np.ones(len(df), dtype=bool)
+
+    for col in NAN_COLUMNS:
+        if df[col].dtype == object:
+            keep &= df[col].to_numpy() != 'NaN '
+
+    columns = {}
+
+    for col in df.columns:
+        values = df[col].to_numpy()[keep]
+
+        # Removendo os espaços e convertendo os tipos:
+        if col in PARSERS:
+            values = map_unique(values, PARSERS[col], categorical=compact and schema.SCHEMA.get(col) == 'category')
+
+        columns[col] = values
+
+    # Distância entre o restaurante e o local de entrega, calculada uma vez para todas as linhas:
+    columns['distance'] = geo.haversine_distance(columns['Restaurant_latitude'], columns['Restaurant_longitude'],
+                                                 columns['Delivery_location_latitude'], columns['Delivery_location_longitude'])
+
+    # Semana do ano, calculada uma vez para todas as linhas (os gráficos semanais agrupam por ela):
+    columns['week_of_year'] = week_of_year(columns['Order_Date'])
+
+    # O dataframe novo já nasce com o index resetado:
+    df = pd.DataFrame(columns, copy=False)
+
+    # Tipos compactos:
+    if compact:
+        df = schema.apply_schema(df)
+
+    return df
+
+# Função para obter um array somente leitura:
+def readonly(values):
+    """ Essa função devolve o array marcado como somente leitura. Arrays que já são somente leitura (por exemplo, os que
+        apontam para o arquivo colunar mapeado em memória) são aproveitados sem cópia; os demais são copiados antes.
+
+        Input: array numpy
+        Output: array numpy somente leitura
+    """
+    if values.flags.writeable:
+        values = values.copy()
+        values.flags.writeable = False
+
+    return values
+
+# Função para tornar o dataframe somente leitura:
+def freeze(df):
+    """ Essa função devolve um dataframe em que os arrays de cada coluna são somente leitura.
+        Qualquer alteração in-place (df.loc[...] = ..., df.iloc[...] = ...) levanta ValueError, de forma que
+        uma página não consegue corromper o dataframe compartilhado entre as sessões. Criar colunas novas
+        ou filtrar continua funcionando, pois isso gera um novo dataframe.
+        Nas colunas de categoria, os códigos é que ficam somente leitura.
+
+        Input: Dataframe
+        Output: Dataframe somente leitura
+    """
+    columns = {}
+
+    for col in df.columns:
+        series = df[col]
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(readonly(series.cat.codes.to_numpy()), dtype=series.dtype)
+        else:
+            columns[col] = readonly(series.to_numpy())
+
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+# Função para obter a chave de versão de um arquivo:
+def file_key(path):
+    """ Essa função gera a chave que identifica a versão de um arquivo: caminho absoluto, data de modificação e tamanho.
+        Quando o arquivo é substituído, a chave muda e o cache é invalidado.
+
+        Input: caminho do arquivo
+        Output: tupla (caminho, mtime_ns, tamanho)
+    """
+    stat = os.stat(path)
+
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+# Função para obter a chave de versão do dataset:
+def dataset_key(path=DATASET_PATH):
+    """ Essa função gera a chave que identifica a versão do dataset limpo: a versão do CSV e a do arquivo colunar.
+        O arquivo colunar também muda quando novos lotes de pedidos são acrescentados (ver refresh), sem que o CSV mude.
+        Um dataset gerado a partir de vários arquivos (ver build_cache) pode não ter o CSV; nesse caso, a versão do CSV
+        é só o caminho.
+
+        Input: caminho do CSV
+        Output: tupla (versão do CSV, versão do arquivo colunar ou None se ele ainda não existir)
+    """
+    cache_path = store.cache_path(path)
+    csv_key = file_key(path) if os.path.exists(path) else (os.path.abspath(path), None, None)
+
+    return (csv_key, file_key(cache_path) if os.path.exists(cache_path) else None)
+
+# Função para juntar dataframes limpos:
+def concat_clean(frames):
+    """ Essa função junta dataframes limpos (ex.: o dataset e um lote novo de pedidos) num só, com o index resetado.
+        Cada dataframe tem as suas próprias categorias; as colunas de categoria são unidas com union_categoricals
+        (categorias em ordem alfabética), em vez de virarem texto como aconteceria com pd.concat.
+
+        Input: lista de dataframes limpos
+        Output: Dataframe limpo
+    """
+    df = pd.concat(frames, ignore_index=True)
+
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            df[col] = pd.api.types.union_categoricals([frame[col] for frame in frames], sort_categories=True)
+
+    return df
+
+# Função para ler e limpar um arquivo de pedidos:
+def read_clean(path):
+    """ Essa função lê um CSV de pedidos e aplica o clean_code. É a tarefa de cada processo em clean_files.
+
+        Input: caminho do CSV
+        Output: Dataframe limpo
+    """
+    return clean_code(pd.read_csv(path))
+
+# Função para ler e limpar vários arquivos de pedidos em paralelo:
+def clean_files(paths, workers=None):
+    """ Essa função lê e limpa os arquivos (ver read_clean) num pool de processos, um arquivo por tarefa, e junta os
+        resultados (ver concat_clean). A ordem do resultado é a ordem de paths, não a ordem em que os processos
+        terminam, então o dataframe é o mesmo para qualquer quantidade de processos.
+        Os processos são criados com spawn, que é seguro também dentro do servidor do Streamlit (que usa threads).
+
+        Input: lista de caminhos, workers (quantidade de processos; padrão: um por núcleo)
+        Output: Dataframe limpo
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+
+    if workers <= 1:
+        return concat_clean([read_clean(path) for path in paths])
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        frames = list(executor.map(read_clean, paths))
+
+    return concat_clean(frames)
+
+# Função para gerar o arquivo colunar a partir do CSV ou de vários arquivos:
+def build_cache(path=DATASET_PATH, pattern=None, workers=None):
+    """ Essa função lê o CSV, aplica o clean_code e grava o resultado no arquivo colunar ao lado do CSV
+        (dataset/train.csv -> dataset/train.feather).
+
+        Com pattern (ex.: 'dataset/orders/*.csv', um arquivo por região/dia), o dataset passa a ser formado pelos
+        arquivos do padrão, em ordem alfabética, limpos em paralelo (ver clean_files). O padrão fica registrado no
+        arquivo colunar (ver store.write_cache), então as reconstruções seguintes, inclusive as automáticas de load_data,
+        leem de novo os arquivos do padrão em vez do CSV.
+
+        Input: caminho do CSV, pattern (padrão de arquivos ou None), workers (quantidade de processos)
+        Output: caminho do arquivo colunar
+    """
+    cache_path = store.cache_path(path)
+
+    sources = store.cache_sources(cache_path) if pattern is None else {'pattern': pattern}
+
+    if sources is None:
+        store.write_cache(read_clean(path), cache_path)
+
+        return cache_path
+
+    files = sorted(glob.glob(sources['pattern']))
+
+    if not files:
+        raise FileNotFoundError(f'Nenhum arquivo encontrado em {sources["pattern"]}.')
+
+    store.write_cache(clean_files(files, workers), cache_path, sources={'pattern': sources['pattern'], 'files': files})
+
+    return cache_path
+
+# Função para carregar o dataset limpo com cache por processo:
+def load_data(path=DATASET_PATH):
+    """ Essa função carrega o dataset limpo uma única vez por processo.
+        O resultado fica guardado em memória, uma entrada por CSV, junto com a chave de versão do dataset
+        (ver dataset_key). Nas próximas chamadas, inclusive de outras páginas e de outras sessões, o mesmo dataframe é
+        devolvido sem ler nada do disco. Se o arquivo mudar, ele é recarregado na próxima chamada e substitui o anterior.
+
+        A leitura é feita a partir do arquivo colunar (ver store), que é reconstruído antes quando está mais antigo
+        que o CSV. Assim, o CSV só é lido e limpo quando muda; nas demais partidas do processo a carga é uma leitura
+        por memory map.
+        O dataframe devolvido é somente leitura (ver freeze).
+
+        Input: caminho do CSV (padrão: dataset/train.csv)
+        Output: Dataframe limpo
+    """
+    key = dataset_key(path)
+
+    # Uma entrada por CSV (caminho absoluto): a versão nova substitui a antiga em vez de manter o dataframe antigo.
+    name = os.path.abspath(path)
+
+    with _cache_lock:
+        cached = _cache.get(name)
+
+        if cached is not None and cached[0] == key:
+            _stats['hits'] += 1
+            return cached[1]
+
+        start = time.perf_counter()
+
+        cache_path = store.cache_path(path)
+
+        if store.cache_is_stale(path, cache_path):
+            build_cache(path)
+
+        df = freeze(store.read_cache(cache_path))
+        elapsed = time.perf_counter() - start
+
+        # A reconstrução muda a versão do arquivo colunar:
+        key = dataset_key(path)
+
+        _cache[name] = (key, df)
+        _stats['misses'] += 1
+        _stats['load_time'] += elapsed
+        _stats['last_load_time'] = elapsed
+
+    return df
+
+# Função para carregar só os pedidos de um intervalo de datas e de algumas condições de trânsito:
+def load_orders(start=None, end=None, traffic_options=None, path=DATASET_PATH):
+    """ Essa função lê os pedidos limpos com start <= Order_Date < end e Road_traffic_density em traffic_options a partir
+        do dataset particionado por período de Order_Date (ver store.read_partitions). Os filtros são aplicados na
+        leitura: só as partições dos períodos selecionados são abertas, então uma janela curta lê uma fração do histórico
+        e nada além do resultado fica em memória. Os filtros com None não são aplicados.
+
+        As partições são geradas a partir do arquivo colunar quando estão mais antigas que ele (granularidade em
+        PARTITION_GRANULARITY). O dataframe devolvido é somente leitura (ver freeze).
+
+        Exemplo: load_orders(end=date_slider, traffic_options=traffic_options) devolve o mesmo que
+                 filter_orders(load_data(), date_slider, traffic_options), sem carregar o dataset inteiro.
+
+        Input:
+            - start, end: datas limite (start inclusiva, end exclusiva)
+            - traffic_options: lista das condições de trânsito selecionadas
+            - path: caminho do CSV (padrão: dataset/train.csv)
+        Output: Dataframe limpo filtrado
+    """
+    cache_path = store.cache_path(path)
+    partition_path = store.partition_path(path)
+
+    with _cache_lock:
+        if store.cache_is_stale(path, cache_path):
+            build_cache(path)
+
+    # A trava do arquivo colunar (também entre processos) impede que um lote seja acrescentado (ver refresh) enquanto
+    # as partições são geradas. O _cache_lock já foi liberado: o refresh chama load_data com o arquivo travado.
+    with _partition_lock:
+        if store.partitions_are_stale(cache_path, partition_path):
+            with store.file_lock(cache_path):
+                if store.partitions_are_stale(cache_path, partition_path):
+                    store.build_partitions(store.read_cache(cache_path), partition_path, PARTITION_GRANULARITY)
+
+    return freeze(store.read_partitions(partition_path, start, end, traffic_options))
+
+# Função para normalizar o estado dos filtros da barra lateral:
+def filter_state(date_slider, traffic_options, path=DATASET_PATH):
+    """ Essa função gera a chave que identifica o dataframe filtrado de uma página: a versão do dataset,
+        a data limite e as condições de trânsito selecionadas (sem repetição e em ordem alfabética, pois a ordem
+        de seleção no multiselect não muda o resultado).
+
+        Input:
+            - date_slider: data limite selecionada
+            - traffic_options: lista das condições de trânsito selecionadas
+            - path: caminho do CSV carregado
+        Output: tupla (versão do arquivo, data limite, condições de trânsito)
+    """
+    return (dataset_key(path), pd.Timestamp(date_slider), tuple(sorted(set(traffic_options))))
+
+# Função para aplicar os filtros da barra lateral:
+def filter_orders(df, date_slider, traffic_options):
+    """ Essa função aplica os filtros da barra lateral: pedidos anteriores à data limite e com as condições de trânsito
+        selecionadas. As duas condições são combinadas numa única máscara, gerando uma única cópia do dataframe.
+
+        Input:
+            - df: dataframe limpo
+            - date_slider: data limite selecionada
+            - traffic_options: lista das condições de trânsito selecionadas
+        Output: Dataframe filtrado
+    """
+    linhas_selecionadas = (df['Order_Date'] < date_slider) & df['Road_traffic_density'].isin(traffic_options)
+
+    return df.loc[linhas_selecionadas, :]
+
+# Função para adiar a carga dos pedidos filtrados até o primeiro uso:
+def lazy_orders(date_slider, traffic_options, path=DATASET_PATH):
+    """ Essa função devolve uma função sem argumentos que lê os pedidos com os filtros da barra lateral só na primeira
+        chamada; as chamadas seguintes devolvem o mesmo dataframe. A leitura é feita pelas partições por período
+        (ver load_orders), então uma data limite curta lê só as partições dos períodos anteriores a ela, com o filtro
+        de trânsito aplicado na própria leitura. O resultado é o mesmo de filter_orders(load_data(), ...).
+        As páginas a passam para cache.cached e maps.map_html no lugar do dataframe filtrado: quando o resultado já está
+        em cache, os pedidos não são carregados nem filtrados.
+
+        Input:
+            - date_slider: data limite selecionada
+            - traffic_options: lista das condições de trânsito selecionadas
+            - path: caminho do CSV (padrão: dataset/train.csv)
+        Output: função sem argumentos que devolve o Dataframe filtrado
+    """
+    @functools.cache
+    def orders():
+        with profiling.stage('load_orders'):
+            return load_orders(end=date_slider, traffic_options=traffic_options, path=path)
+
+    return orders
+
+# Função para consultar os contadores do cache:
+def cache_info():
+    """ Essa função devolve os contadores do cache de dados do processo.
+
+        Output: dicionário com hits, misses, load_time (segundos somados de todas as cargas),
+                last_load_time (segundos da última carga) e files (arquivos em cache)
+    """
+    with _cache_lock:
+        info = dict(_stats)
+        info['files'] = len(_cache)
+
+    return info
+
+# Função para esvaziar o cache:
+def clear_cache():
+    """ Essa função descarta os dataframes em cache e zera os contadores.
+    """
+    with _cache_lock:
+        _cache.clear()
+        _stats.update({'hits': 0, 'misses': 0, 'load_time': 0.0, 'last_load_time': 0.0})
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função gera o arquivo colunar quando ele está desatualizado em relação ao CSV (ou sempre, com --force).
+        Com --sources, gera o arquivo colunar a partir de todos os arquivos do padrão, limpos em paralelo por --workers
+        processos (ver build_cache).
+        Com --partitions, gera também as partições por período de Order_Date (ver load_orders).
+
+        Uso: python -m curry_company.data [--path dataset/train.csv] [--force] [--partitions {day,week}]
+                                          [--sources 'dataset/orders/*.csv'] [--workers 16]
+    """
+    parser = argparse.ArgumentParser(description='Gera o arquivo colunar com os dados limpos.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--partitions', choices=['day', 'week'])
+    parser.add_argument('--sources')
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    cache_path = store.cache_path(args.path)
+
+    if args.sources:
+        start = time.perf_counter()
+        build_cache(args.path, args.sources, args.workers)
+        files = store.cache_sources(cache_path)['files']
+        print(f'{cache_path} gerado a partir de {len(files)} arquivo(s) de {args.sources} ({time.perf_counter() - start:.1f} s).')
+    elif args.force or store.cache_is_stale(args.path, cache_path):
+        build_cache(args.path)
+        sources = store.cache_sources(cache_path)
+        print(f'{cache_path} gerado a partir de {sources["pattern"] if sources else args.path}.')
+    else:
+        print(f'{cache_path} já está atualizado.')
+
+    if args.partitions:
+        partition_path = store.partition_path(args.path)
+
+        store.build_partitions(store.read_cache(cache_path), partition_path, args.partitions)
+        print(f'{partition_path} gerado com partições por {args.partitions}.')
+
+if __name__ == '__main__':
+    main()
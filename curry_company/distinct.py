@@ -0,0 +1,292 @@
+#==============================================
+# Libraries
+#==============================================
+import numpy as np
+import pandas as pd
+
+from curry_company.cache import RESOURCES
+from curry_company.data import DATASET_PATH, concat_clean, dataset_key, load_data
+
+#==============================================
+# Configurações
+#==============================================
+
+# Granularidade do pré-agregado de entregadores: dia x semana x condição de trânsito (as colunas dos filtros e dos gráficos).
+DIMENSIONS = ['Order_Date', 'week_of_year', 'Road_traffic_density']
+
+# Precisão padrão do sketch HyperLogLog: 2**12 registradores por linha, erro padrão de cerca de 1.04 / raiz(4096) = 1.6%.
+PRECISION = 12
+
+# Quantidade de bits 1 em cada byte, para contar os entregadores de um bitset:
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+#==============================================
+# Classes
+#==============================================
+
+class CourierSets:
+    """ Pré-agregado para contar entregadores distintos em qualquer janela de datas e condições de trânsito.
+        Cada linha de keys é uma combinação de DIMENSIONS, com a quantidade de pedidos (orders), e tem:
+        - bitsets: um bit por entregador (o código da categoria Delivery_person_ID), ligado se ele fez pedidos ali.
+          A união de várias linhas é um OU bit a bit e a contagem é exata.
+        - registers (opcional): os registradores de um sketch HyperLogLog dos entregadores da linha. A união é o máximo
+          de cada registrador; a contagem é aproximada, mas o tamanho não depende da quantidade de entregadores.
+
+        Os IDs são convertidos em inteiros uma única vez (códigos da categoria do dataframe limpo), então nenhuma contagem
+        precisa comparar textos. As categorias ficam em couriers (o bit i é o entregador couriers[i]).
+    """
+
+    def __init__(self, keys, bitsets, registers=None, couriers=None):
+        self.keys = keys
+        self.bitsets = bitsets
+        self.registers = registers
+        self.couriers = couriers
+
+    def filter(self, date_slider, traffic_options):
+        """ Essa função devolve as linhas com Order_Date < date_slider e Road_traffic_density em traffic_options
+            (os filtros da barra lateral, ver data.filter_orders).
+
+            Input: data limite, lista das condições de trânsito
+            Output: CourierSets
+        """
+        mask = ((self.keys['Order_Date'] < date_slider) & self.keys['Road_traffic_density'].isin(traffic_options)).to_numpy()
+
+        return CourierSets(self.keys.loc[mask, :].reset_index(drop=True),
+                           self.bitsets[mask],
+                           None if self.registers is None else self.registers[mask],
+                           self.couriers)
+
+    def count(self, by=(), approximate=False):
+        """ Essa função conta os entregadores distintos das linhas, agrupando por by.
+
+            Input: by (colunas de keys; vazio para o total), approximate (True para usar o sketch HyperLogLog)
+            Output: int (by vazio) ou Dataframe com as colunas de by e Delivery_person_ID
+        """
+        by = list(by)
+
+        if approximate and self.registers is None:
+            raise ValueError('O sketch HyperLogLog não foi calculado (use build_courier_sets(df, sketch=True)).')
+
+        values = self.registers if approximate else self.bitsets
+        merge = np.maximum if approximate else np.bitwise_or
+        estimate = hll_estimate if approximate else (lambda bits: POPCOUNT[bits].sum(axis=-1, dtype=np.int64))
+
+        if not by:
+            return int(estimate(merge.reduce(values, axis=0, initial=0)))
+
+        if not len(self.keys):
+            return self.keys.loc[:, by].assign(Delivery_person_ID=np.array([], dtype=np.int64))
+
+        # Linhas ordenadas por grupo; reduceat junta as linhas de cada grupo de uma vez:
+        groups = self.keys.groupby(by, observed=True, sort=True).ngroup().to_numpy()
+        order = np.argsort(groups, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(groups[order]) != 0])
+
+        df_aux = self.keys.iloc[order[starts]].loc[:, by].reset_index(drop=True)
+
+        df_aux['Delivery_person_ID'] = estimate(merge.reduceat(values[order], starts, axis=0))
+
+        return df_aux
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para verificar se um objeto é um pré-agregado de entregadores:
+def is_courier_sets(frame):
+    """ Essa função verifica se o objeto recebido é um CourierSets ou um dataframe.
+
+        Input: CourierSets ou Dataframe
+        Output: True ou False
+    """
+    return isinstance(frame, CourierSets)
+
+# Função para calcular o hash de 64 bits de cada entregador:
+def courier_hashes(ids):
+    """ Essa função calcula um hash de 64 bits para cada ID de entregador (pd.util.hash_array, estável entre processos).
+
+        Input: array com os IDs (as categorias de Delivery_person_ID)
+        Output: array uint64
+    """
+    return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+# Função para calcular o registrador e o valor de cada hash no sketch HyperLogLog:
+def hll_positions(hashes, precision=PRECISION):
+    """ Essa função separa cada hash de 64 bits em registrador (os precision primeiros bits) e valor (1 + a quantidade
+        de zeros à esquerda dos bits restantes). A contagem de zeros é feita em duas metades de 32 bits, que o float64
+        representa sem arredondamento.
+
+        Input: array uint64 com os hashes, precision
+        Output: arrays com o registrador (int64) e o valor (uint8) de cada hash
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+
+    high = (rest >> np.uint64(32)).astype(np.float64)
+    low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+
+    with np.errstate(divide='ignore'):
+        zeros = np.where(high > 0, 31 - np.floor(np.log2(high)), 63 - np.floor(np.log2(low)))
+
+    # Só há 64 - precision bits depois do registrador:
+    rank = np.minimum(np.where(rest > 0, zeros + 1, 64 - precision + 1), 64 - precision + 1)
+
+    return index, rank.astype(np.uint8)
+
+# Função para estimar a quantidade de distintos a partir dos registradores:
+def hll_estimate(registers):
+    """ Essa função estima a quantidade de valores distintos de cada linha de registradores (HyperLogLog), com a
+        correção por contagem linear para cardinalidades pequenas.
+
+        Input: array uint8 (linhas x registradores) ou um único vetor de registradores
+        Output: array (ou número) com as estimativas arredondadas
+    """
+    registers = np.asarray(registers, dtype=np.float64)
+    m = registers.shape[-1]
+
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers), axis=-1)
+
+    empty = np.sum(registers == 0, axis=-1)
+
+    linear = m * np.log(m / np.maximum(empty, 1))
+
+    return np.round(np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)).astype(np.int64)
+
+# Função para montar o pré-agregado de entregadores:
+def build_courier_sets(df, sketch=True, precision=PRECISION):
+    """ Essa função monta o pré-agregado de entregadores (ver CourierSets) a partir do dataframe limpo, numa única passada:
+        cada pedido liga o bit do seu entregador na linha do seu dia e trânsito (np.bitwise_or.at) e, com sketch=True,
+        atualiza o registrador correspondente do sketch HyperLogLog (np.maximum.at).
+
+        Input: dataframe limpo, sketch (True para calcular também o HyperLogLog), precision (bits do registrador)
+        Output: CourierSets
+    """
+    grouped = df.groupby(DIMENSIONS, observed=True, sort=True)
+
+    keys = grouped.size().rename('orders').reset_index()
+    rows = grouped.ngroup().to_numpy()
+
+    ids = df['Delivery_person_ID'].cat
+    codes = ids.codes.to_numpy().astype(np.int64)
+
+    bitsets = np.zeros((len(keys), (len(ids.categories) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bitsets, (rows, codes >> 3), (1 << (codes & 7)).astype(np.uint8))
+
+    registers = None
+
+    if sketch:
+        index, rank = hll_positions(courier_hashes(ids.categories)[codes], precision)
+
+        registers = np.zeros((len(keys), 2 ** precision), dtype=np.uint8)
+        np.maximum.at(registers, (rows, index), rank)
+
+    return CourierSets(keys, bitsets, registers, ids.categories)
+
+# Função para carregar o pré-agregado de entregadores do dataset:
+def load_courier_sets(path=DATASET_PATH):
+    """ Essa função devolve o pré-agregado de entregadores do dataset, montado uma única vez por versão do dataset e
+        compartilhado por todas as sessões do processo. Com a ingestão em lotes ligada (ver ingest.enabled), vem dos
+        resumos dos lotes do CSV, sem carregar os pedidos.
+
+        Input: caminho do CSV (padrão: dataset/train.csv)
+        Output: CourierSets
+    """
+    # Importado aqui porque o ingest usa este módulo:
+    from curry_company import ingest
+
+    if ingest.enabled():
+        return ingest.load_aggregates(path)['couriers']
+
+    df = load_data(path)
+
+    return RESOURCES.get_or_compute(('courier_sets', dataset_key(path)), lambda: build_courier_sets(df))
+
+# Função para trocar os entregadores dos bitsets:
+def remap_bitsets(bitsets, couriers, categories):
+    """ Essa função muda os bitsets da ordem de couriers para a ordem de categories (ex.: depois que um lote novo traz
+        entregadores novos e as categorias de Delivery_person_ID são refeitas em ordem alfabética). O bit de cada
+        entregador vai para a posição dele em categories.
+
+        Input: bitsets (uint8, um bit por entregador de couriers), couriers, categories (contém todos os couriers)
+        Output: bitsets na ordem de categories
+    """
+    bits = np.unpackbits(bitsets, axis=1, count=len(couriers), bitorder='little')
+
+    remapped = np.zeros((len(bitsets), len(categories)), dtype=np.uint8)
+    remapped[:, pd.Index(categories).get_indexer(couriers)] = bits
+
+    return np.packbits(remapped, axis=1, bitorder='little')
+
+# Função para juntar pré-agregados de partes diferentes dos pedidos:
+def combine_courier_sets(parts):
+    """ Essa função junta pré-agregados montados a partir de partes diferentes dos pedidos (ex.: os lotes do CSV lidos
+        pelo ingest), cada um com as suas próprias categorias de Delivery_person_ID. Os bitsets passam para a união das
+        categorias, em ordem alfabética (ver remap_bitsets), e as linhas com as mesmas DIMENSIONS são juntadas de uma vez:
+        os pedidos são somados, os bitsets combinados com OU e os registradores com o máximo. O resultado é o mesmo de
+        build_courier_sets com todos os pedidos.
+
+        Input: lista de CourierSets (todos com ou todos sem o sketch, com a mesma precisão)
+        Output: CourierSets
+    """
+    categories = pd.Index(sorted(set().union(*(part.couriers for part in parts))))
+
+    keys = concat_clean([part.keys for part in parts])
+    bitsets = np.concatenate([remap_bitsets(part.bitsets, part.couriers, categories) for part in parts])
+
+    sketch = parts[0].registers is not None
+
+    # Linhas ordenadas por grupo; reduceat junta as linhas de cada grupo de uma vez (ver CourierSets.count):
+    groups = keys.groupby(DIMENSIONS, observed=True, sort=True).ngroup().to_numpy()
+    order = np.argsort(groups, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(groups[order]) != 0])
+
+    registers = None
+
+    if sketch:
+        registers = np.maximum.reduceat(np.concatenate([part.registers for part in parts])[order], starts, axis=0)
+
+    return CourierSets(keys.groupby(DIMENSIONS, observed=True, sort=True)['orders'].sum().reset_index(),
+                       np.bitwise_or.reduceat(bitsets[order], starts, axis=0),
+                       registers,
+                       categories)
+
+# Função para atualizar o pré-agregado de entregadores depois da chegada de novos pedidos:
+def update_courier_sets(sets, df, days):
+    """ Essa função atualiza o pré-agregado de entregadores recalculando apenas os dias afetados por novos pedidos, como
+        cube.update_cube: as linhas desses dias são descartadas e montadas de novo a partir dos pedidos desses dias no
+        dataframe atualizado. Os bitsets das linhas mantidas passam para as categorias atuais de Delivery_person_ID
+        (ver remap_bitsets); os registradores do sketch dependem só do hash do ID e são mantidos como estão.
+
+        Input:
+            - sets: CourierSets anterior (montado por build_courier_sets)
+            - df: dataframe limpo já com os novos pedidos
+            - days: datas (Order_Date) dos novos pedidos
+        Output: CourierSets atualizado
+    """
+    days = pd.DatetimeIndex(days).unique()
+    categories = df['Delivery_person_ID'].cat.categories
+
+    kept = ~sets.keys['Order_Date'].isin(days).to_numpy()
+
+    bitsets = sets.bitsets[kept]
+
+    if not sets.couriers.equals(categories):
+        bitsets = remap_bitsets(bitsets, sets.couriers, categories)
+
+    sketch = sets.registers is not None
+    precision = int(np.log2(sets.registers.shape[1])) if sketch else PRECISION
+
+    rebuilt = build_courier_sets(df.loc[df['Order_Date'].isin(days), :], sketch, precision)
+
+    keys = concat_clean([sets.keys.loc[kept, :], rebuilt.keys])
+
+    # Mesma ordem de build_courier_sets (linhas ordenadas por DIMENSIONS):
+    order = keys.sort_values(DIMENSIONS, kind='stable').index.to_numpy()
+
+    return CourierSets(keys.iloc[order].reset_index(drop=True),
+                       np.concatenate([bitsets, rebuilt.bitsets])[order],
+                       np.concatenate([sets.registers[kept], rebuilt.registers])[order] if sketch else None,
+                       categories)
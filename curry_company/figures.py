@@ -0,0 +1,42 @@
+#==============================================
+# Libraries
+#==============================================
+import streamlit as st
+
+from curry_company import profiling
+from curry_company.cache import FIGURES
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para obter o gráfico montado pelo cache:
+def figure(name, state, build, *args):
+    """ Essa função devolve a figura do gráfico a partir do cache de gráficos.
+        A chave é o nome do gráfico e o estado normalizado dos filtros (ver data.filter_state), como em cache.cached:
+        os dados do gráfico são determinados pelo estado dos filtros, então sessões com os mesmos filtros recebem a mesma
+        figura sem montá-la de novo (px.bar, go.Figure etc.). Numa falta, build(*args) monta a figura.
+        A figura guardada é compartilhada entre as sessões e não deve ser alterada.
+
+        Input:
+            - name: nome do gráfico, único no app (ex.: 'Empresa.order_metric')
+            - state: estado normalizado dos filtros
+            - build: função que monta a figura
+            - args: argumentos de build
+        Output: figura do plotly
+    """
+    with profiling.stage(f'figure:{name}'):
+        return FIGURES.get_or_compute((name, state), lambda: build(*args))
+
+# Função para montar (ou obter do cache) e exibir um gráfico:
+def chart(name, state, build, *args):
+    """ Essa função exibe o gráfico name do estado dos filtros state com o st.plotly_chart, montado por build(*args)
+        só quando ainda não está no cache de gráficos (ver figure).
+
+        Exemplo:
+            figures.chart('Empresa.order_metric', state, order_metric, cube, state)
+
+        Input: nome do gráfico, estado normalizado dos filtros, função que monta a figura, argumentos de build
+        Output: Não tem return.
+    """
+    st.plotly_chart(figure(name, state, build, *args), use_container_width=True)
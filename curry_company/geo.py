@@ -0,0 +1,50 @@
+#==============================================
+# Libraries
+#==============================================
+import numpy as np
+
+#==============================================
+# Configurações
+#==============================================
+
+# Raio médio da Terra em km (o mesmo usado pelo pacote haversine):
+EARTH_RADIUS_KM = 6371.0088
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para calcular a distância entre dois pontos em todas as linhas de uma vez:
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """ Essa função calcula a distância do grande círculo (fórmula de haversine), em km, entre os pontos (lat1, lon1)
+        e (lat2, lon2). Recebe colunas inteiras (arrays ou Series) e faz a conta com operações vetorizadas do NumPy,
+        sem chamar uma função Python por linha. O resultado é o mesmo de haversine((lat1, lon1), (lat2, lon2)).
+
+        Input: latitudes e longitudes em graus
+        Output: array com as distâncias em km
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(values, dtype=float)) for values in (lat1, lon1, lat2, lon2))
+
+    d = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+# Função para contar os pontos de cada célula de uma grade de latitude/longitude:
+def grid_density(lat, lon, cell_size=0.01):
+    """ Essa função agrupa os pontos (lat, lon) numa grade regular de células de cell_size graus e conta os pontos
+        de cada célula. Cada ponto recebe a linha e a coluna da sua célula, que são combinadas num único inteiro, e a
+        contagem é feita com np.unique sobre esse inteiro, sem loop em Python. Só as células com pontos são devolvidas.
+
+        Input: latitudes e longitudes em graus, cell_size (tamanho da célula em graus; 0.01 grau é cerca de 1 km)
+        Output: arrays com a latitude e a longitude do centro de cada célula e a quantidade de pontos
+    """
+    rows = np.floor(np.asarray(lat, dtype=float) / cell_size).astype(np.int64)
+    cols = np.floor(np.asarray(lon, dtype=float) / cell_size).astype(np.int64)
+
+    # As colunas cabem com folga em 2**32 células para qualquer cell_size razoável:
+    cells, counts = np.unique((rows << 32) + (cols - np.iinfo(np.int32).min), return_counts=True)
+
+    rows = cells >> 32
+    cols = (cells & 0xFFFFFFFF) + np.iinfo(np.int32).min
+
+    return (rows + 0.5) * cell_size, (cols + 0.5) * cell_size, counts
@@ -0,0 +1,184 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from curry_company import store
+from curry_company.cache import RESOURCES
+from curry_company.cube import DIMENSIONS, build_cube
+from curry_company.data import DATASET_PATH, clean_code, dataset_key, freeze
+from curry_company.distinct import build_courier_sets, combine_courier_sets
+from curry_company.refresh import INBOX_PATH
+
+#==============================================
+# Configurações
+#==============================================
+
+# Modo de ingestão opcional: com CURRY_COMPANY_INGEST=chunked, o cubo e o pré-agregado de entregadores das páginas vêm
+# dos resumos do CSV lido em lotes (ver load_aggregates), sem carregar a tabela inteira.
+INGEST_VARIABLE = 'CURRY_COMPANY_INGEST'
+
+# Quantidade de linhas do CSV lidas e limpas por vez:
+CHUNKSIZE = 50_000
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para verificar se a ingestão em lotes está ligada:
+def enabled():
+    """ Essa função verifica se o cubo e o pré-agregado de entregadores devem vir dos resumos em lotes
+        (variável de ambiente CURRY_COMPANY_INGEST=chunked).
+
+        Output: True ou False
+    """
+    return os.environ.get(INGEST_VARIABLE, '').lower() == 'chunked'
+
+# Função para ler e limpar os CSVs em lotes:
+def clean_chunks(paths, chunksize=CHUNKSIZE):
+    """ Essa função lê os CSVs, um depois do outro, em lotes de chunksize linhas e aplica o clean_code em cada lote.
+        Só um lote fica em memória por vez.
+
+        Input: caminho do CSV ou lista de caminhos, chunksize (linhas por lote)
+        Output: gerador de dataframes limpos (um por lote)
+    """
+    for path in [paths] if isinstance(paths, str) else paths:
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield clean_code(chunk)
+
+# Função para converter as colunas de categoria de um resumo em texto:
+def plain_columns(df):
+    """ Essa função converte as colunas de categoria em texto. Cada lote limpo tem as suas próprias categorias,
+        então os resumos de lotes diferentes só podem ser juntados depois dessa conversão.
+
+        Input: Dataframe
+        Output: Dataframe sem colunas de categoria
+    """
+    columns = {col: df[col].astype(df[col].cat.categories.dtype)
+               for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+
+    return df.assign(**columns)
+
+# Função para resumir um lote de pedidos limpos:
+def summarize(df):
+    """ Essa função resume um dataframe de pedidos limpos nos agregados que as páginas usam:
+        - cube: cubo diário com contagens, somas e somas dos quadrados (ver cube.build_cube), sem colunas de categoria
+        - couriers: pré-agregado de entregadores por dia e trânsito (ver distinct.build_courier_sets)
+        Os dois resumos crescem com a quantidade de dias e de combinações, não com a quantidade de pedidos.
+
+        Input: Dataframe limpo
+        Output: dicionário {'cube': Dataframe, 'couriers': CourierSets}
+    """
+    return {'cube': plain_columns(build_cube(df)), 'couriers': build_courier_sets(df)}
+
+# Função para juntar os resumos dos lotes:
+def merge(summaries):
+    """ Essa função junta os resumos de todos os lotes (ver summarize) de uma vez: as linhas dos cubos com as mesmas
+        dimensões são somadas num único agrupamento e os pré-agregados de entregadores são combinados
+        (ver distinct.combine_courier_sets). O resultado é o mesmo de resumir todos os pedidos juntos.
+
+        Input: lista de dicionários de resumo
+        Output: dicionário de resumo
+    """
+    cube = (pd.concat([summary['cube'] for summary in summaries], ignore_index=True)
+              .groupby(DIMENSIONS)
+              .sum()
+              .reset_index())
+
+    return {'cube': cube, 'couriers': combine_courier_sets([summary['couriers'] for summary in summaries])}
+
+# Função para preparar um resumo para uso nas páginas:
+def finalize(aggregates):
+    """ Essa função converte as colunas de texto do cubo em categoria, como no dataframe limpo, e o deixa somente
+        leitura (ver data.freeze), pronto para ser compartilhado entre as sessões.
+
+        Input: dicionário de resumo
+        Output: dicionário de resumo
+    """
+    cube = aggregates['cube']
+
+    columns = {col: cube[col].astype('category') for col in cube.columns if cube[col].dtype == object}
+
+    return {'cube': freeze(cube.assign(**columns)), 'couriers': aggregates['couriers']}
+
+# Função para resumir os CSVs sem carregar a tabela inteira:
+def ingest(paths=DATASET_PATH, chunksize=CHUNKSIZE):
+    """ Essa função lê os CSVs em lotes (ver clean_chunks), guarda o resumo de cada lote e junta todos os resumos
+        no final, numa única vez (ver merge). A memória usada é a de um lote mais a dos resumos, então arquivos
+        maiores que a memória podem ser processados.
+
+        Input: caminho do CSV ou lista de caminhos, chunksize (linhas por lote)
+        Output: dicionário {'cube': Dataframe, 'couriers': CourierSets} (ver summarize e finalize)
+    """
+    summaries = [summarize(chunk) for chunk in clean_chunks(paths, chunksize)]
+
+    if not summaries:
+        raise ValueError(f'{paths} não tem pedidos.')
+
+    return finalize(merge(summaries))
+
+# Função para listar os arquivos de pedidos do dataset:
+def source_files(path=DATASET_PATH, inbox=INBOX_PATH):
+    """ Essa função lista os CSVs que formam o dataset: o CSV (ou os arquivos do padrão, ver data.build_cache) e os
+        lotes já acrescentados pelo refresh (ver store.appended_files), na ordem em que entraram no dataset.
+
+        Input: caminho do CSV, pasta dos lotes
+        Output: lista de caminhos
+    """
+    cache_path = store.cache_path(path)
+    sources = store.cache_sources(cache_path)
+
+    files = [path] if sources is None else list(sources['files'])
+
+    if os.path.exists(cache_path):
+        files += [os.path.join(inbox, name) for name in store.appended_files(cache_path)]
+
+    return files
+
+# Função para carregar os resumos do dataset:
+def load_aggregates(path=DATASET_PATH, chunksize=CHUNKSIZE, inbox=INBOX_PATH):
+    """ Essa função devolve os resumos do dataset (ver ingest e source_files), calculados uma única vez por versão do
+        dataset (ver data.dataset_key) e compartilhados por todas as sessões do processo, sem manter os pedidos em
+        memória. É a origem de cube.load_cube e distinct.load_courier_sets com a ingestão em lotes ligada (ver enabled).
+        Quando o refresh acrescenta um lote, a versão muda e os resumos são refeitos.
+
+        Input: caminho do CSV, chunksize (linhas por lote), pasta dos lotes
+        Output: dicionário {'cube': Dataframe, 'couriers': CourierSets}
+    """
+    return RESOURCES.get_or_compute(('aggregates', dataset_key(path), chunksize),
+                                    lambda: ingest(source_files(path, inbox), chunksize))
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função resume o CSV em lotes e mostra o tamanho dos resumos, o tempo e o pico de memória.
+
+        Uso: python -m curry_company.ingest [--path dataset/train.csv] [--chunksize 50000]
+    """
+    parser = argparse.ArgumentParser(description='Resume o CSV em lotes, sem carregar a tabela inteira.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    aggregates = ingest(args.path, args.chunksize)
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f'Pedidos: {aggregates["cube"]["orders"].sum()}')
+    print(f'Linhas do cubo: {len(aggregates["cube"])}')
+    print(f'Linhas de entregadores por dia e trânsito: {len(aggregates["couriers"].keys)}')
+    print(f'Entregadores: {aggregates["couriers"].count()}')
+    print(f'Tempo: {elapsed:.2f} s | Pico de memória: {peak / 1024 ** 2:.1f} MB')
+
+if __name__ == '__main__':
+    main()
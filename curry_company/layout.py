@@ -0,0 +1,27 @@
+#==============================================
+# Libraries
+#==============================================
+import streamlit as st
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para exibir o seletor de abas da página:
+def tab_selector(labels, key):
+    """ Essa função exibe as abas da página como um seletor horizontal (st.radio) e devolve o nome da aba escolhida.
+        O st.tabs executa o conteúdo de todas as abas em cada execução e só esconde as outras no navegador; com o
+        seletor, a página executa apenas o bloco da aba escolhida (if aba == ...), e as demais só são calculadas
+        quando forem abertas. As agregações de cada aba ficam no cache (ver cache.cached), então voltar a uma aba
+        já vista não refaz as contas. A escolha fica no estado da sessão (key) entre as execuções.
+
+        Exemplo:
+            aba = layout.tab_selector(['Visão Gerencial', 'Visão Tática'], 'empresa_tab')
+
+            if aba == 'Visão Gerencial':
+                ...
+
+        Input: lista com os nomes das abas, key (chave do seletor, única no app)
+        Output: nome da aba escolhida
+    """
+    return st.radio('Aba', labels, horizontal=True, key=key, label_visibility='collapsed')
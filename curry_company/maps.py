@@ -0,0 +1,93 @@
+#==============================================
+# Libraries
+#==============================================
+import folium
+from folium.plugins import FastMarkerCluster, HeatMap
+
+from curry_company import metrics, profiling
+from curry_company.cache import MAPS, resolve
+
+#==============================================
+# Configurações
+#==============================================
+
+# Tamanho das células (em graus) da grade de densidade das entregas (cerca de 1 km) e dos restaurantes (cerca de 100 m):
+DELIVERY_CELL_SIZE = 0.01
+RESTAURANT_CELL_SIZE = 0.001
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para gerar o mapa da Visão Geográfica:
+def country_map(df):
+    """ Essa função gera o mapa da Visão Geográfica com três camadas, que podem ser ligadas e desligadas no controle do mapa:
+        1. Localização central de cada cidade por tipo de tráfego (um marcador por combinação, ver metrics.city_traffic_location)
+        2. Densidade das entregas: mapa de calor sobre a grade de metrics.location_density, com uma entrada por célula
+           em vez de uma por pedido
+        3. Restaurantes: os pontos da grade fina dos restaurantes, agrupados em clusters no navegador (FastMarkerCluster),
+           o que permite exibir milhares de pontos sem criar um objeto do folium por ponto
+
+        Input: df (dataframe de pedidos filtrado)
+        Output: folium.Map
+    """
+    map = folium.Map()
+
+    # Localização central de cada cidade por tipo de tráfego:
+    df_aux = metrics.city_traffic_location(df)
+
+    centers = folium.FeatureGroup(name='Localização central por cidade e tráfego')
+
+    for city, traffic, latitude, longitude in zip(df_aux['City'], df_aux['Road_traffic_density'],
+                                                  df_aux['Delivery_location_latitude'], df_aux['Delivery_location_longitude']):
+
+        popup = folium.Popup(f""" City: {city}<br>
+        Densidade de tráfego: {traffic}
+        """,
+        max_width=500,
+        )
+
+        folium.Marker([latitude, longitude], popup=popup).add_to(centers)
+
+    centers.add_to(map)
+
+    # Densidade das entregas, com peso igual à quantidade de pedidos da célula:
+    deliveries = metrics.location_density(df, 'Delivery_location', DELIVERY_CELL_SIZE)
+
+    HeatMap(deliveries[['latitude', 'longitude', 'orders']].to_numpy().tolist(),
+            name='Densidade das entregas', radius=12).add_to(map)
+
+    # Restaurantes:
+    restaurants = metrics.location_density(df, 'Restaurant', RESTAURANT_CELL_SIZE)
+
+    FastMarkerCluster(restaurants[['latitude', 'longitude']].to_numpy().tolist(),
+                      name='Restaurantes', show=False).add_to(map)
+
+    folium.LayerControl().add_to(map)
+
+    return map
+
+# Função para gerar o HTML do mapa da Visão Geográfica:
+def country_map_html(df):
+    """ Essa função gera o HTML do mapa da Visão Geográfica (ver country_map), pronto para ser exibido com
+        streamlit.components.v1.html. O HTML é uma string, então pode ser guardado no cache de mapas (ver map_html)
+        e reaproveitado enquanto os filtros não mudarem, sem montar o mapa de novo.
+
+        Input: df (dataframe de pedidos filtrado)
+        Output: HTML do mapa
+    """
+    return folium.Figure().add_child(country_map(df)).render()
+
+# Função para obter o HTML do mapa da Visão Geográfica pelo cache de mapas:
+def map_html(df, state):
+    """ Essa função devolve o HTML do mapa da Visão Geográfica a partir do cache de mapas (cache.MAPS), limitado pela
+        memória ocupada, como o cache de gráficos. A chave é o estado normalizado dos filtros (ver data.filter_state):
+        sessões com os mesmos filtros recebem o mesmo HTML sem montar o mapa. Como em cache.cached, df pode ser uma função
+        que devolve os pedidos (ver data.lazy_orders), chamada só numa falta.
+
+        Input: df (dataframe de pedidos filtrado, seleção do banco local ou função que os devolve),
+               state (estado normalizado dos filtros)
+        Output: HTML do mapa
+    """
+    with profiling.stage('country_map_html'):
+        return MAPS.get_or_compute(('country_map', state), lambda: country_map_html(resolve(df)))
@@ -0,0 +1,416 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from curry_company import distinct, profiles, sql
+from curry_company.cube import count_by, grouped_stats, load_cube, stats_by
+from curry_company.data import DATASET_PATH, filter_orders, load_data
+from curry_company.geo import grid_density
+
+#==============================================
+# Configurações
+#==============================================
+
+# Agrupamentos das avaliações (página Entregadores) e dos tempos de entrega (página Restaurantes):
+RATING_DIMS = (('Road_traffic_density',), ('Weatherconditions',))
+TIME_DIMS = (('Festival',), ('City',), ('City', 'Road_traffic_density'), ('City', 'Type_of_order'))
+
+#==============================================
+# Funções
+#==============================================
+# As funções abaixo recebem o dataframe limpo (já filtrado) e devolvem as tabelas agregadas usadas nos gráficos e
+# tabelas das páginas. Elas não alteram o dataframe recebido, então podem ser guardadas no cache (ver cache.cached).
+# As funções baseadas em count_by e stats_by aceitam também o cubo diário (ver cube), que tem poucas linhas
+# e dá o mesmo resultado, e uma seleção do banco local (ver sql.Orders), que vira uma consulta de agregação;
+# as demais precisam dos pedidos: o dataframe ou a seleção do banco local, nunca o cubo.
+
+# Função para converter as colunas de categoria de uma tabela agregada:
+def plain(df_aux):
+    """ Essa função converte as colunas de categoria da tabela agregada de volta para texto.
+        As categorias guardam todos os valores possíveis, inclusive os que o filtro removeu, e alguns gráficos
+        (ex.: px.sunburst) acabam exibindo esses valores vazios. A tabela agregada é pequena, então a conversão é barata.
+
+        Input: Dataframe agregado
+        Output: Dataframe agregado sem colunas de categoria
+    """
+    columns = {col: df_aux[col].astype(df_aux[col].cat.categories.dtype)
+               for col in df_aux.columns if isinstance(df_aux[col].dtype, pd.CategoricalDtype)}
+
+    return df_aux.assign(**columns)
+
+# Função para converter as colunas de categoria do index de uma tabela agregada:
+def plain_index(df_aux):
+    """ Essa função faz o mesmo que plain, mas para as colunas do index da tabela agregada.
+
+        Input: Dataframe agregado (indexado pelas colunas de agrupamento)
+        Output: Dataframe agregado sem categorias no index
+    """
+    return plain(df_aux.reset_index()).set_index(df_aux.index.names)
+
+# Função para calcular a quantidade de pedidos por dia:
+def orders_by_day(df):
+    """ Essa função calcula a quantidade de pedidos por dia.
+        Agrupa por Order_Date e conta os pedidos (coluna ID).
+
+        Input: df (dataframe de pedidos ou cubo)
+        Output: Dataframe com as colunas Order_Date e ID
+    """
+    df_aux = count_by(df, ['Order_Date'])
+
+    return df_aux
+
+# Função para calcular a participação de cada tipo de tráfego nos pedidos:
+def orders_by_traffic(df):
+    """ Essa função calcula a quantidade e a porcentagem de pedidos por tipo de tráfego.
+        Agrupa por Road_traffic_density e conta os pedidos (coluna ID).
+
+        Input: df (dataframe de pedidos ou cubo)
+        Output: Dataframe com as colunas Road_traffic_density, ID e entregas_perc
+    """
+    df_aux = count_by(df, ['Road_traffic_density'])
+
+    df_aux['entregas_perc'] = df_aux['ID']/df_aux['ID'].sum()
+
+    return plain(df_aux)
+
+# Função para calcular a quantidade de pedidos por cidade e tipo de tráfego:
+def orders_by_city_traffic(df):
+    """ Essa função calcula a quantidade de pedidos por cidade e tipo de tráfego.
+        Agrupa por City e Road_traffic_density e conta os pedidos (coluna ID).
+
+        Input: df (dataframe de pedidos ou cubo)
+        Output: Dataframe com as colunas City, Road_traffic_density e ID
+    """
+    df_aux = count_by(df, ['City', 'Road_traffic_density'])
+
+    return plain(df_aux)
+
+# Função para calcular a quantidade de pedidos por semana:
+def orders_by_week(df):
+    """ Essa função calcula a quantidade de pedidos por semana do ano (coluna week_of_year, calculada na limpeza).
+
+        Input: df (dataframe de pedidos, cubo ou seleção do banco local)
+        Output: Dataframe com as colunas week_of_year e ID
+    """
+    df_aux = count_by(df, ['week_of_year'])
+
+    return df_aux
+
+# Função para calcular a quantidade de pedidos por entregador por semana:
+def orders_per_courier_by_week(df):
+    """ Essa função calcula a quantidade de pedidos por entregador em cada semana do ano.
+        Conta os pedidos (ID) e os entregadores únicos (Delivery_person_ID) por semana num único agrupamento e divide
+        um pelo outro na coluna order_by_deliver.
+
+        Input: df (dataframe de pedidos, pré-agregado de entregadores (ver distinct.CourierSets) ou seleção do banco local)
+        Output: Dataframe com as colunas week_of_year, ID, Delivery_person_ID e order_by_deliver
+    """
+    if distinct.is_courier_sets(df):
+        df_aux = df.keys.groupby('week_of_year')['orders'].sum().rename('ID').reset_index()
+        df_aux['Delivery_person_ID'] = df.count(['week_of_year'])['Delivery_person_ID']
+    elif sql.is_orders(df):
+        df_aux = sql.query(df, 'COUNT("ID") AS "ID", COUNT(DISTINCT "Delivery_person_ID") AS "Delivery_person_ID"', ['week_of_year'])
+    else:
+        df_aux = (df.groupby('week_of_year')
+                    .agg(ID=('ID', 'count'), Delivery_person_ID=('Delivery_person_ID', 'nunique'))
+                    .reset_index())
+
+    df_aux['order_by_deliver'] = df_aux['ID']/df_aux['Delivery_person_ID']
+
+    return df_aux
+
+# Função para contar os entregadores únicos:
+def unique_couriers(df):
+    """ Essa função conta os entregadores distintos.
+
+        Input: df (dataframe de pedidos, pré-agregado de entregadores (ver distinct.CourierSets) ou seleção do banco local)
+        Output: int
+    """
+    if distinct.is_courier_sets(df):
+        return df.count()
+
+    if sql.is_orders(df):
+        return int(sql.count_distinct(df, [], 'Delivery_person_ID').iloc[0, 0])
+
+    return df['Delivery_person_ID'].nunique()
+
+# Função para calcular a localização central de cada cidade por tipo de tráfego:
+def city_traffic_location(df):
+    """ Essa função calcula a mediana da latitude e da longitude dos locais de entrega por cidade e tipo de tráfego.
+
+        Input: df (dataframe de pedidos ou seleção do banco local)
+        Output: Dataframe com as colunas City, Road_traffic_density, Delivery_location_latitude e Delivery_location_longitude
+    """
+    if sql.is_orders(df):
+        return sql.group_medians(df, ['City', 'Road_traffic_density'], ['Delivery_location_latitude', 'Delivery_location_longitude'])
+
+    df_aux = (df.loc[:, ['Delivery_location_latitude', 'Delivery_location_longitude', 'City', 'Road_traffic_density']]
+                .groupby(['City', 'Road_traffic_density'], observed=True)
+                .median()
+                .reset_index())
+
+    return plain(df_aux)
+
+# Função para calcular a densidade de pontos (locais de entrega ou restaurantes) numa grade:
+def location_density(df, point='Delivery_location', cell_size=0.01):
+    """ Essa função conta os pedidos em cada célula de uma grade de latitude/longitude (ver geo.grid_density).
+        Com point='Delivery_location' usa os locais de entrega; com point='Restaurant', os restaurantes.
+
+        Input: df (dataframe de pedidos ou seleção do banco local), point (prefixo das colunas de latitude/longitude),
+               cell_size (tamanho da célula em graus)
+        Output: Dataframe com as colunas latitude, longitude (centro da célula) e orders
+    """
+    if sql.is_orders(df):
+        latitude, longitude, orders = sql.grid_density(df, f'{point}_latitude', f'{point}_longitude', cell_size)
+    else:
+        latitude, longitude, orders = grid_density(df[f'{point}_latitude'], df[f'{point}_longitude'], cell_size)
+
+    # Os centros são arredondados para não carregar ruído de ponto flutuante (ex.: 12.345000000000001) para o mapa:
+    df_aux = pd.DataFrame({'latitude': latitude.round(6), 'longitude': longitude.round(6), 'orders': orders})
+
+    return df_aux
+
+# Função para calcular a avaliação média por entregador:
+def rating_by_courier(df):
+    """ Essa função calcula a avaliação média de cada entregador.
+
+        Input: df (dataframe de pedidos ou seleção do banco local)
+        Output: Dataframe com as colunas Delivery_person_ID e Delivery_person_Ratings
+    """
+    df_aux = (stats_by(df, ['Delivery_person_ID'], 'Delivery_person_Ratings')
+                .loc[:, ['Delivery_person_ID', 'mean']]
+                .rename(columns={'mean': 'Delivery_person_Ratings'}))
+
+    return plain(df_aux)
+
+# Função para calcular a avaliação média e o desvio padrão por vários agrupamentos:
+def rating_stats(df, dims):
+    """ Essa função calcula a quantidade de pedidos (count), a avaliação média (delivery_mean) e o desvio padrão das
+        avaliações (delivery_std) para cada agrupamento de dims, numa única passada sobre os dados (ver cube.grouped_stats).
+
+        Input: df (dataframe de pedidos ou cubo), dims: tupla de tuplas com as colunas de cada agrupamento
+        Output: dicionário {agrupamento: Dataframe indexado pelas colunas do agrupamento}
+    """
+    stats = grouped_stats(df, 'Delivery_person_Ratings', dims)
+
+    return {d: plain_index(df_aux.rename(columns={'mean': 'delivery_mean', 'std': 'delivery_std'})) for d, df_aux in stats.items()}
+
+# Função para obter a tabela de um agrupamento de rating_stats ou time_stats:
+def stats_table(stats, dims):
+    """ Essa função devolve a tabela de um agrupamento do resultado de rating_stats ou time_stats no formato exibido
+        nas páginas: as colunas do agrupamento, a média e o desvio padrão (sem a contagem).
+
+        Input: resultado de rating_stats ou time_stats, tupla com as colunas do agrupamento
+        Output: Dataframe
+    """
+    return stats[tuple(dims)].drop(columns='count').reset_index()
+
+# Função para calcular as idades e as condições de veículo extremas dos entregadores:
+def courier_extremes(df):
+    """ Essa função calcula a maior e a menor idade dos entregadores e a melhor e a pior condição de veículo.
+
+        Input: df (dataframe de pedidos ou seleção do banco local)
+        Output: dicionário com max_age, min_age, best_condition e worst_condition
+    """
+    if sql.is_orders(df):
+        select = ('MAX("Delivery_person_Age") AS max_age, MIN("Delivery_person_Age") AS min_age, '
+                  'MAX("Vehicle_condition") AS best_condition, MIN("Vehicle_condition") AS worst_condition')
+
+        return sql.query(df, select, []).iloc[0].to_dict()
+
+    return {'max_age': df['Delivery_person_Age'].max(),
+            'min_age': df['Delivery_person_Age'].min(),
+            'best_condition': df['Vehicle_condition'].max(),
+            'worst_condition': df['Vehicle_condition'].min()}
+
+# Função para calcular o tempo médio de entrega de cada entregador por cidade:
+def courier_time_means(df):
+    """ Essa função calcula o tempo médio de entrega de cada entregador em cada cidade.
+
+        Input: df (dataframe de pedidos ou seleção do banco local)
+        Output: Dataframe com as colunas City, Delivery_person_ID e Time_taken(min)
+    """
+    df_aux = (stats_by(df, ['City', 'Delivery_person_ID'], 'Time_taken(min)')
+                .loc[:, ['City', 'Delivery_person_ID', 'mean']]
+                .rename(columns={'mean': 'Time_taken(min)'}))
+
+    return df_aux
+
+# Função para obter os k entregadores mais rápidos e os k mais lentos de cada cidade:
+def top_couriers(df, k=10):
+    """ Essa função calcula os k entregadores mais rápidos e os k mais lentos de cada cidade.
+        As médias por entregador são calculadas uma única vez (ver courier_time_means) e, em cada cidade, os k menores
+        e os k maiores tempos são obtidos por seleção parcial (nsmallest/nlargest), sem ordenar a tabela inteira.
+        Todas as cidades presentes nos dados aparecem no resultado, em ordem alfabética.
+
+        Input: df (dataframe de pedidos ou seleção do banco local), k (quantidade de
+               entregadores por cidade, padrão: 10)
+        Output: dicionário {'fastest': Dataframe, 'slowest': Dataframe}, cada um com as colunas City, Delivery_person_ID
+                e Time_taken(min), ordenado por cidade e, dentro da cidade, do mais rápido (ou mais lento) para o outro extremo
+    """
+    df_aux = courier_time_means(df)
+
+    times = df_aux.groupby('City', observed=True)['Time_taken(min)']
+
+    # O último nível do index de nsmallest/nlargest é a posição da linha em df_aux:
+    fastest = df_aux.loc[times.nsmallest(k).index.get_level_values(-1)].reset_index(drop=True)
+    slowest = df_aux.loc[times.nlargest(k).index.get_level_values(-1)].reset_index(drop=True)
+
+    return {'fastest': plain(fastest), 'slowest': plain(slowest)}
+
+# Função para calcular o tempo médio e o desvio padrão de entrega por vários agrupamentos:
+def time_stats(df, dims):
+    """ Essa função calcula a quantidade de pedidos (count), o tempo médio (avg_time) e o desvio padrão (std_time) de
+        entrega para cada agrupamento de dims, numa única passada sobre os dados (ver cube.grouped_stats).
+        As métricas da página indexam o resultado, ex.: time_stats(df, dims)[('Festival',)].loc['Yes', 'avg_time'].
+
+        Input: df (dataframe de pedidos ou cubo), dims: tupla de tuplas com as colunas de cada agrupamento
+        Output: dicionário {agrupamento: Dataframe indexado pelas colunas do agrupamento}
+    """
+    stats = grouped_stats(df, 'Time_taken(min)', dims)
+
+    return {d: plain_index(df_aux.rename(columns={'mean': 'avg_time', 'std': 'std_time'})) for d, df_aux in stats.items()}
+
+# Função para obter o tempo médio ou o desvio padrão de entrega com ou sem festival:
+def festival_time(stats, festival, op):
+    """ Essa função lê o tempo médio (op='avg_time') ou o desvio padrão (op='std_time') de entrega dos pedidos com
+        (festival='Yes') ou sem (festival='No') festival no resultado de time_stats, arredondado com 2 casas decimais.
+
+        Input: resultado de time_stats (inclui o agrupamento por Festival), festival, op
+        Output: float (ou None, se não houver pedidos com essa condição de festival)
+    """
+    df_aux = stats[('Festival',)]
+
+    if festival not in df_aux.index:
+        return None
+
+    return np.round(df_aux.loc[festival, op], 2)
+
+# Função para calcular a distância média por cidade:
+def distance_by_city(df):
+    """ Essa função calcula a distância média entre os restaurantes e os locais de entrega por cidade.
+
+        Input: df (dataframe de pedidos ou cubo)
+        Output: Dataframe com as colunas City e distance
+    """
+    df_aux = (stats_by(df, ['City'], 'distance')
+                .loc[:, ['City', 'mean']]
+                .rename(columns={'mean': 'distance'}))
+
+    return plain(df_aux)
+
+# Função para calcular a distância média geral:
+def avg_distance(df):
+    """ Essa função calcula a distância média entre os restaurantes e os locais de entrega de todos os pedidos.
+
+        Input: df (dataframe de pedidos ou cubo)
+        Output: float
+    """
+    return stats_by(df, [], 'distance').loc[0, 'mean']
+
+# Função para calcular todas as métricas do dashboard:
+def kpis(df, cube, couriers, k=10, path=DATASET_PATH):
+    """ Essa função calcula todas as métricas das três páginas para os dados recebidos (já filtrados), sem o Streamlit.
+        Serve para pré-calcular as métricas em lote, conferir resultados e medir as funções fora das páginas.
+        Como na página, os perfis dos entregadores (courier_profiles) cobrem todo o histórico do dataset em path,
+        sem os filtros (ver profiles.load_courier_profiles).
+
+        Input:
+            - df: dataframe de pedidos ou seleção do banco local
+            - cube: cubo diário ou seleção do banco local (ver cube e sql)
+            - couriers: pré-agregado de entregadores ou seleção do banco local (ver distinct e sql)
+            - k: quantidade de entregadores por cidade nos rankings
+            - path: caminho do CSV do dataset (perfis dos entregadores)
+        Output: dicionário {nome da métrica: número, dicionário ou Dataframe}
+    """
+    ratings = rating_stats(cube, RATING_DIMS)
+    times = time_stats(cube, TIME_DIMS)
+    top = top_couriers(df, k)
+
+    return {# Empresa
+            'orders_by_day': orders_by_day(cube),
+            'orders_by_traffic': orders_by_traffic(cube),
+            'orders_by_city_traffic': orders_by_city_traffic(cube),
+            'orders_by_week': orders_by_week(cube),
+            'orders_per_courier_by_week': orders_per_courier_by_week(couriers),
+            'city_traffic_location': city_traffic_location(df),
+            # Entregadores
+            'courier_extremes': courier_extremes(df),
+            'rating_by_courier': rating_by_courier(df),
+            'rating_by_traffic': stats_table(ratings, ('Road_traffic_density',)),
+            'rating_by_weather': stats_table(ratings, ('Weatherconditions',)),
+            'fastest_couriers': top['fastest'],
+            'slowest_couriers': top['slowest'],
+            'courier_profiles': profiles.load_courier_profiles(path),
+            # Restaurantes
+            'unique_couriers': unique_couriers(couriers),
+            'avg_distance': avg_distance(cube),
+            'distance_by_city': distance_by_city(cube),
+            'festival_time': {f'{festival}_{op}': festival_time(times, festival, op)
+                              for festival in ('Yes', 'No') for op in ('avg_time', 'std_time')},
+            'time_by_city': stats_table(times, ('City',)),
+            'time_by_city_traffic': stats_table(times, ('City', 'Road_traffic_density')),
+            'time_by_city_order': stats_table(times, ('City', 'Type_of_order'))}
+
+# Função para converter as métricas em valores que o JSON aceita:
+def to_json(value):
+    """ Essa função converte o resultado de kpis (Dataframes, números do numpy, datas e NaN) em listas, dicionários,
+        números e textos.
+
+        Input: valor
+        Output: valor convertível com json.dumps
+    """
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient='records', date_format='iso'))
+
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if isinstance(value, float) and np.isnan(value):
+        return None
+
+    return value
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função calcula todas as métricas do dashboard com os filtros informados e grava o resultado em JSON
+        (ou o imprime, sem --output).
+
+        Uso: python -m curry_company.metrics [--path dataset/train.csv] [--date 2022-04-13]
+                                             [--traffic Low Medium High Jam] [--output metricas.json]
+    """
+    parser = argparse.ArgumentParser(description='Calcula as métricas do dashboard sem o Streamlit.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--date', default='2022-04-13')
+    parser.add_argument('--traffic', nargs='+', default=['Low', 'Medium', 'High', 'Jam'])
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    date = pd.Timestamp(args.date)
+
+    # Com o backend SQL, todas as métricas são consultas ao banco local, sem carregar os pedidos:
+    if sql.enabled():
+        df = cube = couriers = sql.orders(date, args.traffic, args.path)
+    else:
+        df = filter_orders(load_data(args.path), date, args.traffic)
+        cube = filter_orders(load_cube(args.path), date, args.traffic)
+        couriers = distinct.load_courier_sets(args.path).filter(date, args.traffic)
+
+    result = json.dumps(to_json(kpis(df, cube, couriers, path=args.path)), indent=2, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(result)
+    else:
+        print(result)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#==============================================
+# Libraries
+#==============================================
+import numpy as np
+import pandas as pd
+
+from curry_company import sql
+from curry_company.cache import RESOURCES
+from curry_company.cube import count_by, stats_by
+from curry_company.data import DATASET_PATH, dataset_key, freeze, load_data
+
+#==============================================
+# Funções
+#==============================================
+# O perfil de cada entregador resume todo o histórico dele, sem os filtros da barra lateral: a tabela tem uma linha por
+# entregador, é montada uma única vez por versão do dataset (ver load_courier_profiles) e, a cada lote novo, só os
+# entregadores do lote são recalculados (ver update_courier_profiles).
+
+# Função para juntar os nomes das colunas verdadeiras de cada linha:
+def labels(mask):
+    """ Essa função junta, para cada linha, os nomes das colunas com valor True, separados por vírgula.
+        Há poucas colunas (cidades ou tipos de veículo), então a junção é feita coluna a coluna, sem apply por linha.
+
+        Input: Dataframe booleano
+        Output: array de textos
+    """
+    text = np.full(len(mask), '', dtype=object)
+
+    for col in mask.columns:
+        text = text + np.where(mask[col].to_numpy(), f'{col}, ', '')
+
+    return np.array([value[:-2] for value in text], dtype=object)
+
+# Função para contar os pedidos de cada entregador por uma coluna:
+def courier_counts(frame, col):
+    """ Essa função conta os pedidos de cada entregador por valor de col (ex.: City), um valor por coluna, em ordem
+        alfabética.
+
+        Input: dataframe de pedidos ou seleção do banco local, nome da coluna
+        Output: Dataframe indexado por Delivery_person_ID (texto), com uma coluna por valor de col
+    """
+    df_aux = count_by(frame, ['Delivery_person_ID', col])
+
+    df_aux = df_aux.assign(**{'Delivery_person_ID': df_aux['Delivery_person_ID'].astype(str), col: df_aux[col].astype(str)})
+
+    return df_aux.pivot_table(index='Delivery_person_ID', columns=col, values='ID', aggfunc='sum', fill_value=0).sort_index(axis=1)
+
+# Função para montar os perfis dos entregadores:
+def courier_profiles(frame):
+    """ Essa função calcula o perfil de cada entregador dos pedidos recebidos: quantidade de pedidos, avaliação média e
+        desvio padrão, tempo de entrega médio e desvio padrão, cidades atendidas, tipos de veículo e datas do primeiro e
+        do último pedido. Com uma seleção do banco local (ver sql.Orders), cada parte é uma consulta de agregação.
+        O resultado fica ordenado pelo ID, o que permite buscar por prefixo com busca binária (ver tables.search).
+
+        Input: dataframe de pedidos ou seleção do banco local
+        Output: Dataframe com as colunas Delivery_person_ID, orders, rating_mean, rating_std, time_mean, time_std,
+                cities, vehicles, first_order e last_order
+    """
+    by = ['Delivery_person_ID']
+
+    ratings = stats_by(frame, by, 'Delivery_person_Ratings')
+    times = stats_by(frame, by, 'Time_taken(min)')
+
+    if sql.is_orders(frame):
+        dates = sql.query(frame, 'MIN("Order_Date") AS "min", MAX("Order_Date") AS "max"', by)
+        dates[['min', 'max']] = dates[['min', 'max']].apply(pd.to_datetime, format=sql.DATE_FORMAT)
+    else:
+        dates = frame.groupby(by, observed=True)['Order_Date'].agg(['min', 'max']).reset_index()
+
+    # Todas as partes ficam indexadas pelo ID em texto, que é o mesmo nos pedidos e no banco:
+    ratings, times, dates = [df_aux.assign(Delivery_person_ID=df_aux['Delivery_person_ID'].astype(str)).set_index(by)
+                             for df_aux in (ratings, times, dates)]
+
+    cities = courier_counts(frame, 'City').reindex(times.index, fill_value=0)
+    vehicles = courier_counts(frame, 'Type_of_vehicle').reindex(times.index, fill_value=0)
+
+    df_aux = pd.DataFrame({'orders': times['count'].astype('int64'),
+                           'rating_mean': ratings['mean'].reindex(times.index),
+                           'rating_std': ratings['std'].reindex(times.index),
+                           'time_mean': times['mean'],
+                           'time_std': times['std'],
+                           'cities': labels(cities > 0),
+                           'vehicles': labels(vehicles > 0),
+                           'first_order': dates['min'].reindex(times.index),
+                           'last_order': dates['max'].reindex(times.index)}, index=times.index).reset_index()
+
+    return df_aux.sort_values('Delivery_person_ID', ignore_index=True)
+
+# Função para carregar os perfis de todos os entregadores do dataset:
+def load_courier_profiles(path=DATASET_PATH):
+    """ Essa função devolve os perfis de todos os entregadores (todo o histórico, sem os filtros da barra lateral),
+        calculados uma única vez por versão do dataset e compartilhados por todas as sessões do processo (somente leitura,
+        como o cubo). Com o backend SQL ou a ingestão em lotes ligados (ver sql.orders_enabled), são calculados por
+        consultas ao banco local, sem carregar os pedidos.
+
+        Input: caminho do CSV (padrão: dataset/train.csv)
+        Output: Dataframe dos perfis (ver courier_profiles)
+    """
+    frame = sql.orders(None, None, path) if sql.orders_enabled() else load_data(path)
+
+    return RESOURCES.get_or_compute(('courier_profiles', dataset_key(path)), lambda: freeze(courier_profiles(frame)))
+
+# Função para atualizar os perfis depois da chegada de novos pedidos:
+def update_courier_profiles(df_profiles, frame, couriers):
+    """ Essa função atualiza os perfis recalculando apenas os entregadores com pedidos novos, como cube.update_cube faz
+        com os dias. Os perfis dos demais entregadores não mudam.
+
+        Input:
+            - df_profiles: perfis anteriores
+            - frame: dataframe limpo ou seleção de todos os pedidos do banco local, já com os novos pedidos
+            - couriers: IDs (Delivery_person_ID) dos entregadores dos novos pedidos
+        Output: Dataframe dos perfis atualizados
+    """
+    couriers = pd.Index(couriers).astype(str).unique()
+
+    if sql.is_orders(frame):
+        selected = sql.Orders(frame.path, couriers=couriers)
+    else:
+        selected = frame.loc[frame['Delivery_person_ID'].isin(couriers), :]
+
+    kept = df_profiles.loc[~df_profiles['Delivery_person_ID'].isin(couriers), :]
+    rebuilt = courier_profiles(selected)
+
+    return pd.concat([kept, rebuilt]).sort_values('Delivery_person_ID', ignore_index=True)
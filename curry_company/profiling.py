@@ -0,0 +1,267 @@
+#==============================================
+# Libraries
+#==============================================
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+#==============================================
+# Configurações
+#==============================================
+
+# Perfil de desempenho opcional: com CURRY_COMPANY_PROFILE=1, todas as sessões começam com o perfil ligado
+# (cada sessão também pode ligar ou desligar pela barra lateral, ver sidebar_toggle).
+PROFILE_VARIABLE = 'CURRY_COMPANY_PROFILE'
+
+# Chave do estado da sessão com a escolha da barra lateral:
+SESSION_KEY = 'profile'
+
+# Chave do estado da sessão com o perfil da execução em andamento (ver start):
+RUN_KEY = 'profile_run'
+
+# Linha de log por execução, no terminal do servidor do Streamlit:
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s: %(message)s'))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+# O streamlit só é importado nas funções que exibem algo, para que o módulo (e o cache, que mede as agregações)
+# possa ser usado fora das páginas, como nos benchmarks.
+
+# Perfil da execução atual, usado pelas etapas (cada execução de página roda inteira numa thread). Com o fastReruns do
+# Streamlit, a execução seguinte da mesma sessão pode rodar em outra thread, por isso o perfil também fica no estado da
+# sessão (RUN_KEY), onde o start seguinte o encontra:
+_local = threading.local()
+
+# Quantidade de perfis em andamento; o tracemalloc só fica ligado enquanto houver algum:
+_tracing_lock = threading.Lock()
+_tracing = {'profilers': 0, 'started': False}
+
+#==============================================
+# Classes
+#==============================================
+
+class Profiler:
+    """ Registro das etapas de uma execução de página: para cada etapa, o tempo (perf_counter), a variação da memória
+        alocada (tracemalloc) e o pico de memória acima do início da etapa. As etapas podem ser aninhadas
+        (ex.: a agregação em cache dentro do gráfico que a usa); cada uma guarda a sua profundidade.
+
+        O tracemalloc é do processo inteiro: com várias sessões executando ao mesmo tempo, a memória de uma etapa
+        inclui a das outras sessões. O tempo de cada etapa não é afetado.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.stages = []
+        self._stack = []
+        self.started = time.perf_counter()
+
+        # Se o perfil ainda conta como em andamento para o tracemalloc (ver _acquire_tracing e _release_tracing):
+        self.tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        """ Essa função mede o bloco with como uma etapa.
+
+            Input: nome da etapa
+        """
+        parent = self._stack[-1] if self._stack else None
+        memory = tracemalloc.get_traced_memory()
+
+        # O pico da etapa mãe até aqui é guardado antes de zerar o pico para a etapa nova:
+        if parent is not None:
+            parent['peak'] = max(parent['peak'], memory[1])
+
+        tracemalloc.reset_peak()
+
+        entry = {'stage': name, 'depth': len(self._stack), 'start_memory': memory[0], 'peak': 0}
+        self.stages.append(entry)
+        self._stack.append(entry)
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            entry['seconds'] = time.perf_counter() - start
+
+            current, peak = tracemalloc.get_traced_memory()
+            entry['peak'] = max(entry['peak'], peak)
+
+            self._stack.pop()
+
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], entry['peak'])
+
+            entry['memory_mb'] = (current - entry['start_memory']) / 1024**2
+            entry['peak_mb'] = max(entry['peak'] - entry['start_memory'], 0) / 1024**2
+
+    def total(self):
+        """ Essa função devolve o tempo desde o início da execução da página.
+
+            Output: segundos
+        """
+        return time.perf_counter() - self.started
+
+    def table(self):
+        """ Essa função devolve as etapas medidas numa tabela, com o nome recuado pela profundidade.
+
+            Output: Dataframe com as colunas Etapa, Tempo (s), Memória (MB) e Pico (MB)
+        """
+        return pd.DataFrame({'Etapa': ['    ' * s['depth'] + s['stage'] for s in self.stages],
+                             'Tempo (s)': [s['seconds'] for s in self.stages],
+                             'Memória (MB)': [s['memory_mb'] for s in self.stages],
+                             'Pico (MB)': [s['peak_mb'] for s in self.stages]})
+
+    def log_line(self):
+        """ Essa função resume a execução numa linha de log: página, tempo total e tempo e memória de cada etapa
+            de primeiro nível.
+
+            Output: texto
+        """
+        stages = ' '.join(f'{s["stage"]}={s["seconds"]:.3f}s/{s["memory_mb"]:+.1f}MB'
+                          for s in self.stages if s['depth'] == 0)
+
+        return f'page={self.page} total={self.total():.3f}s {stages}'
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para verificar se o perfil está ligado por padrão:
+def enabled():
+    """ Essa função verifica se a variável de ambiente CURRY_COMPANY_PROFILE liga o perfil de desempenho.
+
+        Output: True ou False
+    """
+    return os.environ.get(PROFILE_VARIABLE, '').lower() in ('1', 'true', 'yes', 'on')
+
+# Função para ligar o tracemalloc enquanto houver perfis em andamento:
+def _acquire_tracing(profiler):
+    """ Essa função registra um perfil em andamento e liga o tracemalloc, se ainda não estiver ligado.
+
+        Input: Profiler
+    """
+    with _tracing_lock:
+        profiler.tracing = True
+        _tracing['profilers'] += 1
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['started'] = True
+
+# Função para desligar o tracemalloc quando o último perfil termina:
+def _release_tracing(profiler):
+    """ Essa função registra o fim de um perfil e desliga o tracemalloc quando não há outro em andamento
+        (só se foi ligado por este módulo). Um perfil já encerrado não é contado de novo, então a função pode ser chamada
+        mais de uma vez para o mesmo perfil (pelo finish da execução e pelo start da execução seguinte).
+
+        Input: Profiler
+    """
+    with _tracing_lock:
+        if not profiler.tracing:
+            return
+
+        profiler.tracing = False
+        _tracing['profilers'] -= 1
+
+        if _tracing['profilers'] == 0 and _tracing['started']:
+            tracemalloc.stop()
+            _tracing['started'] = False
+
+# Função para começar o perfil de uma execução de página:
+def start(page):
+    """ Essa função começa o perfil da execução atual da página, se ele estiver ligado na sessão (barra lateral) ou,
+        na falta da escolha da sessão, pela variável de ambiente. Precisa ser chamada no início do script da página,
+        antes das etapas medidas, com o restante da página num try/finally que chama finish.
+
+        Input: nome da página
+        Output: Profiler ou None (perfil desligado)
+    """
+    import streamlit as st
+
+    # O perfil de uma execução anterior da sessão que não chegou a finish (ex.: interrompida por um rerun, em outra
+    # thread) é encerrado aqui:
+    previous = st.session_state.get(RUN_KEY)
+
+    if previous is not None:
+        _release_tracing(previous)
+
+    _local.profiler = None
+    st.session_state[RUN_KEY] = None
+
+    if not st.session_state.get(SESSION_KEY, enabled()):
+        return None
+
+    profiler = Profiler(page)
+
+    _acquire_tracing(profiler)
+
+    _local.profiler = profiler
+    st.session_state[RUN_KEY] = profiler
+
+    return profiler
+
+# Função para medir uma etapa da execução atual:
+def stage(name):
+    """ Essa função devolve o gerenciador de contexto que mede o bloco with como uma etapa do perfil da execução atual.
+        Com o perfil desligado, o bloco é executado sem medição.
+
+        Exemplo:
+            with profiling.stage('load_data'):
+                df = load_data()
+
+        Input: nome da etapa
+        Output: gerenciador de contexto
+    """
+    profiler = getattr(_local, 'profiler', None)
+
+    return nullcontext() if profiler is None else profiler.stage(name)
+
+# Função para exibir a opção do perfil na barra lateral:
+def sidebar_toggle():
+    """ Essa função exibe na barra lateral a opção de ligar o perfil de desempenho. A escolha fica no estado da sessão
+        e vale para todas as páginas a partir da próxima execução.
+    """
+    import streamlit as st
+
+    def update():
+        st.session_state[SESSION_KEY] = st.session_state[f'{SESSION_KEY}_toggle']
+
+    st.sidebar.checkbox('Perfil de desempenho', value=st.session_state.get(SESSION_KEY, enabled()),
+                        key=f'{SESSION_KEY}_toggle', on_change=update)
+
+# Função para terminar o perfil da execução atual:
+def finish():
+    """ Essa função termina o perfil da execução atual: grava uma linha de log com o resumo e exibe o painel com o
+        tempo e a memória de cada etapa no fim da página. Com o perfil desligado, não faz nada. As páginas a chamam no
+        finally do script, então o perfil também é encerrado quando a execução termina com erro ou é interrompida.
+    """
+    import streamlit as st
+
+    profiler = getattr(_local, 'profiler', None)
+
+    if profiler is None:
+        return
+
+    _local.profiler = None
+    _release_tracing(profiler)
+
+    # A execução seguinte da sessão pode já ter começado outro perfil:
+    if st.session_state.get(RUN_KEY) is profiler:
+        st.session_state[RUN_KEY] = None
+
+    logger.info(profiler.log_line())
+
+    with st.expander(f'Perfil de desempenho: {profiler.total():.3f} s', expanded=True):
+        st.dataframe(profiler.table().style.format({'Tempo (s)': '{:.3f}', 'Memória (MB)': '{:+.1f}', 'Pico (MB)': '{:.1f}'}),
+                     use_container_width=True, hide_index=True)
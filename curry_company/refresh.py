@@ -0,0 +1,184 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+import os
+import threading
+
+import pandas as pd
+
+from curry_company import sql, store
+from curry_company.cache import RESOURCES
+from curry_company.cube import update_cube
+from curry_company.distinct import update_courier_sets
+from curry_company.data import DATASET_PATH, build_cache, clean_code, concat_clean, dataset_key, freeze, load_data
+from curry_company.profiles import update_courier_profiles
+
+#==============================================
+# Configurações
+#==============================================
+
+# Pasta onde chegam os novos lotes de pedidos (arquivos CSV com as mesmas colunas do train.csv):
+INBOX_PATH = 'dataset/incoming'
+
+# Evita que duas sessões do mesmo processo acrescentem o mesmo lote ao mesmo tempo (entre processos, a trava é o
+# store.file_lock do arquivo colunar):
+_refresh_lock = threading.Lock()
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para listar os lotes que ainda não foram acrescentados ao dataset:
+def pending_files(path=DATASET_PATH, inbox=INBOX_PATH):
+    """ Essa função lista os CSVs da pasta inbox que ainda não foram acrescentados ao arquivo colunar do dataset
+        (ver store.appended_files), em ordem alfabética. Os lotes são só acrescentados (append-only): um arquivo
+        já acrescentado não é lido de novo, mesmo que mude.
+
+        Input: caminho do CSV do dataset, pasta dos lotes
+        Output: lista de nomes de arquivos
+    """
+    if not os.path.isdir(inbox):
+        return []
+
+    appended = set(store.appended_files(store.cache_path(path)))
+
+    return sorted(name for name in os.listdir(inbox) if name.endswith('.csv') and name not in appended)
+
+# Função para acrescentar lotes ao dataset limpo:
+def append_files(path, inbox, names):
+    """ Essa função limpa os lotes (ver data.clean_code) e grava o arquivo colunar do dataset com os pedidos novos
+        no final, registrando os nomes dos lotes no mesmo arquivo (ver store.write_cache). O CSV original não é alterado.
+        Se as partições por período estiverem atualizadas, os pedidos novos são gravados nelas como arquivos novos
+        nos períodos afetados (ver store.write_partitions). Da mesma forma, se o banco local estiver atualizado, os
+        pedidos novos são inseridos nele (ver sql.append_database).
+
+        Custo: o arquivo colunar é um único arquivo Feather, que não aceita acréscimos, então cada lote regrava o arquivo
+        inteiro (leitura por memory map e escrita proporcionais a todo o histórico, não só ao lote). Só o clean_code, o
+        banco local e os pré-agregados em memória (ver refresh) custam o tamanho do lote. É uma troca aceitável com lotes
+        pouco frequentes; com muitos lotes pequenos, vale juntar os arquivos na pasta antes de chamar o refresh.
+
+        Deve ser chamada com o arquivo colunar travado (ver store.file_lock). Os lotes que outro processo já acrescentou
+        são ignorados.
+
+        Input: caminho do CSV do dataset, pasta dos lotes, nomes dos lotes
+        Output: Dataframe limpo só com os pedidos novos (None se todos os lotes já tiverem sido acrescentados)
+    """
+    cache_path = store.cache_path(path)
+    partition_path = store.partition_path(path)
+    db_path = sql.database_path(path)
+
+    # Partições e banco atualizados recebem só os pedidos do lote; desatualizados são refeitos na próxima leitura:
+    partitions_ok = not store.partitions_are_stale(cache_path, partition_path)
+    database_ok = not sql.database_is_stale(cache_path, db_path)
+
+    stored = store.read_cache(cache_path)
+    appended = store.appended_files(cache_path)
+
+    # Confere de novo, já com o arquivo lido, os lotes registrados nele:
+    names = [name for name in names if name not in appended]
+
+    if not names:
+        return None
+
+    batch = concat_clean([clean_code(pd.read_csv(os.path.join(inbox, name))) for name in names])
+
+    df = concat_clean([stored, batch])
+
+    store.write_cache(df, cache_path, appended=appended + list(names), sources=store.cache_sources(cache_path))
+
+    if partitions_ok:
+        granularity = store.partition_info(partition_path)['granularity']
+
+        store.write_partitions(batch, partition_path, granularity, basename=f'append{len(appended)}')
+
+    if database_ok:
+        sql.append_database(batch, db_path, cache_path)
+
+    return batch
+
+# Função para atualizar o dataset com os novos lotes:
+def refresh(path=DATASET_PATH, inbox=INBOX_PATH):
+    """ Essa função acrescenta ao dataset os lotes novos da pasta inbox e atualiza os dados em memória do processo:
+        1. Os lotes são limpos e gravados no final do arquivo colunar (só os pedidos novos passam pelo clean_code)
+        2. O dataframe limpo é relido do arquivo colunar por memory map na próxima chamada de load_data (os pedidos
+           só são carregados aqui se os pré-agregados em memória precisarem deles)
+        3. Se o cubo diário estiver em memória, só as linhas dos dias dos pedidos novos são recalculadas (ver cube.update_cube);
+           o mesmo vale para o pré-agregado de entregadores (ver distinct.update_courier_sets)
+        4. Se os perfis dos entregadores estiverem em memória, só os entregadores dos pedidos novos são recalculados
+           (ver profiles.update_courier_profiles)
+        Como a versão do dataset muda (ver data.dataset_key), as agregações em cache passam a usar chaves novas.
+        Sem lotes novos, custa só a listagem da pasta.
+
+        Input: caminho do CSV do dataset, pasta dos lotes
+        Output: lista com os nomes dos lotes acrescentados
+    """
+    if not os.path.isdir(inbox):
+        return []
+
+    cache_path = store.cache_path(path)
+
+    with _refresh_lock:
+        if not store.cache_is_stale(path, cache_path) and not pending_files(path, inbox):
+            return []
+
+        # A lista de lotes é refeita com a trava, pois outro processo pode ter acrescentado parte deles. Os pré-agregados
+        # em memória só são atualizados se corresponderem ao arquivo colunar que recebe o lote (se outro processo
+        # acrescentou lotes antes, a chave mudou e eles são montados de novo quando forem usados):
+        with store.file_lock(cache_path):
+            # Garante que o arquivo colunar exista e esteja atualizado antes de acrescentar, sem carregar os pedidos:
+            if store.cache_is_stale(path, cache_path):
+                build_cache(path)
+
+            cube = RESOURCES.peek(('cube', dataset_key(path)))
+            sets = RESOURCES.peek(('courier_sets', dataset_key(path)))
+            df_profiles = RESOURCES.peek(('courier_profiles', dataset_key(path)))
+
+            names = pending_files(path, inbox)
+            batch = append_files(path, inbox, names) if names else None
+
+            if batch is None:
+                return []
+
+            if cube is not None:
+                RESOURCES.put(('cube', dataset_key(path)), freeze(update_cube(cube, load_data(path), batch['Order_Date'])))
+
+            if sets is not None:
+                RESOURCES.put(('courier_sets', dataset_key(path)), update_courier_sets(sets, load_data(path), batch['Order_Date']))
+
+            if df_profiles is not None:
+                # Com o banco local (ver sql.orders_enabled), os entregadores do lote são recalculados por consultas ao banco,
+                # que recebeu o lote em append_files; se o banco estava desatualizado, os perfis são refeitos quando forem usados:
+                if not sql.orders_enabled():
+                    frame = load_data(path)
+                elif not sql.database_is_stale(cache_path, sql.database_path(path)):
+                    frame = sql.Orders(sql.database_path(path))
+                else:
+                    frame = None
+
+                if frame is not None:
+                    RESOURCES.put(('courier_profiles', dataset_key(path)),
+                                  freeze(update_courier_profiles(df_profiles, frame, batch['Delivery_person_ID'])))
+
+    return names
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função acrescenta ao dataset os lotes novos da pasta de entrada.
+
+        Uso: python -m curry_company.refresh [--path dataset/train.csv] [--inbox dataset/incoming]
+    """
+    parser = argparse.ArgumentParser(description='Acrescenta ao dataset limpo os novos lotes de pedidos.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    parser.add_argument('--inbox', default=INBOX_PATH)
+    args = parser.parse_args()
+
+    names = refresh(args.path, args.inbox)
+
+    if names:
+        print(f'{len(names)} lote(s) acrescentado(s): {", ".join(names)}')
+    else:
+        print('Nenhum lote novo.')
+
+if __name__ == '__main__':
+    main()
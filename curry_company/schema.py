@@ -0,0 +1,92 @@
+#==============================================
+# Libraries
+#==============================================
+import argparse
+
+import pandas as pd
+
+#==============================================
+# Configurações
+#==============================================
+
+# Schema compacto do dataframe limpo:
+# - 'category': texto com poucos valores distintos (as páginas agrupam por essas colunas);
+# - 'integer' / 'float': número convertido para o menor tipo que comporta os valores da coluna.
+# As colunas fora do schema mantêm o tipo que saiu da limpeza. A avaliação (Delivery_person_Ratings) fica em float64:
+# em float32, 4.7 vira 4.699999809 e o erro aparece nas médias e no JSON dos gráficos.
+SCHEMA = {'Delivery_person_ID': 'category',
+          'City': 'category',
+          'Road_traffic_density': 'category',
+          'Weatherconditions': 'category',
+          'Type_of_order': 'category',
+          'Type_of_vehicle': 'category',
+          'Festival': 'category',
+          'Delivery_person_Age': 'integer',
+          'Vehicle_condition': 'integer',
+          'multiple_deliveries': 'integer',
+          'Time_taken(min)': 'integer',
+          'week_of_year': 'integer'}
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para aplicar o schema compacto:
+def apply_schema(df):
+    """ Essa função converte as colunas do dataframe limpo para os tipos declarados em SCHEMA.
+        Os textos viram categoria e os números são reduzidos ao menor tipo que comporta os valores
+        (ex.: idade int8, tempo de entrega int8), o que diminui a memória ocupada e acelera os agrupamentos.
+        Atenção: somas de quadrados e produtos sobre colunas reduzidas devem converter antes para float64.
+
+        Input: Dataframe limpo
+        Output: Dataframe com os tipos do schema
+    """
+    columns = {col: df[col] for col in df.columns}
+
+    for col, kind in SCHEMA.items():
+        if kind == 'category':
+            columns[col] = df[col].astype('category')
+        else:
+            columns[col] = pd.to_numeric(df[col], downcast=kind)
+
+    # As colunas que não mudaram de tipo são reaproveitadas sem cópia:
+    return pd.DataFrame(columns, copy=False)
+
+# Função para comparar a memória de cada coluna antes e depois do schema:
+def memory_report(before, after):
+    """ Essa função compara a memória ocupada por cada coluna antes e depois da aplicação do schema.
+
+        Input: dataframe antes e dataframe depois
+        Output: Dataframe com as colunas dtype_before, dtype_after, mb_before, mb_after e reduction (fração economizada),
+                uma linha por coluna e uma linha Total
+    """
+    df_aux = pd.DataFrame({'dtype_before': before.dtypes.astype(str),
+                           'dtype_after': after.dtypes.astype(str),
+                           'mb_before': before.memory_usage(deep=True, index=False) / 1024**2,
+                           'mb_after': after.memory_usage(deep=True, index=False) / 1024**2})
+
+    df_aux.loc['Total', ['mb_before', 'mb_after']] = df_aux[['mb_before', 'mb_after']].sum()
+
+    df_aux['reduction'] = 1 - df_aux['mb_after'] / df_aux['mb_before']
+
+    return df_aux
+
+# Função principal da linha de comando:
+def main():
+    """ Essa função imprime o relatório de memória por coluna do dataset limpo, antes e depois do schema.
+
+        Uso: python -m curry_company.schema [--path dataset/train.csv]
+    """
+    from curry_company.data import DATASET_PATH, clean_code
+
+    parser = argparse.ArgumentParser(description='Relatório de memória do schema compacto.')
+    parser.add_argument('--path', default=DATASET_PATH)
+    args = parser.parse_args()
+
+    before = clean_code(pd.read_csv(args.path), compact=False)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', 10):
+        print(memory_report(before, apply_schema(before)).round(3))
+
+if __name__ == '__main__':
+    main()
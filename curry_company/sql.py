@@ -0,0 +1,376 @@
+#==============================================
+# Libraries
+#==============================================
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+from curry_company import store
+from curry_company.data import DATASET_PATH, build_cache
+
+#==============================================
+# Configurações
+#==============================================
+
+# Backend opcional das agregações: com CURRY_COMPANY_BACKEND=sqlite, as páginas consultam o banco local em vez do cubo em memória.
+BACKEND_VARIABLE = 'CURRY_COMPANY_BACKEND'
+
+# Colunas indexadas (filtros da barra lateral, agrupamentos mais usados e contagem de entregadores):
+INDEXED_COLUMNS = ['Order_Date', 'City', 'Road_traffic_density', 'Delivery_person_ID']
+
+# Formato das datas no banco (texto ISO, que ordena igual às datas):
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_build_lock = threading.Lock()
+
+#==============================================
+# Classes
+#==============================================
+
+class Orders:
+    """ Seleção dos pedidos do banco local pelos filtros da barra lateral. Não carrega pedidos: guarda só o caminho do banco
+        e a cláusula WHERE com os parâmetros, e as funções deste módulo (count_by, group_sums, count_distinct) montam a
+        consulta de agregação a partir dela. As funções de cube e metrics aceitam uma Orders no lugar do dataframe.
+        Os filtros com None não são aplicados (Orders(path) seleciona todos os pedidos); couriers restringe a seleção aos
+        pedidos de alguns entregadores (ex.: os de um lote novo, ver profiles.update_courier_profiles).
+    """
+
+    def __init__(self, path, date_slider=None, traffic_options=None, couriers=None):
+        self.path = path
+
+        conditions = []
+        self.params = []
+
+        if date_slider is not None:
+            conditions.append('Order_Date < ?')
+            self.params.append(pd.Timestamp(date_slider).strftime(DATE_FORMAT))
+
+        if traffic_options is not None:
+            traffic_options = list(traffic_options)
+
+            conditions.append(f'Road_traffic_density IN ({", ".join("?" * len(traffic_options))})')
+            self.params.extend(traffic_options)
+
+        if couriers is not None:
+            couriers = [str(courier) for courier in couriers]
+
+            conditions.append(f'Delivery_person_ID IN ({", ".join("?" * len(couriers))})')
+            self.params.extend(couriers)
+
+        self.where = ' AND '.join(conditions) or '1'
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para verificar se o backend SQL está ligado:
+def enabled():
+    """ Essa função verifica se as páginas devem consultar o banco local (variável de ambiente CURRY_COMPANY_BACKEND=sqlite).
+
+        Output: True ou False
+    """
+    return os.environ.get(BACKEND_VARIABLE, '').lower() == 'sqlite'
+
+# Função para verificar se os pedidos das páginas devem vir do banco local:
+def orders_enabled():
+    """ Essa função verifica se as funções que precisam dos pedidos (mapa, rankings e extremos de entregadores, perfis)
+        devem consultar o banco local: com o backend SQL ligado (ver enabled) ou com a ingestão em lotes ligada
+        (ver ingest.enabled), que não mantém a tabela inteira em memória.
+
+        Output: True ou False
+    """
+    # Importado aqui porque o ingest usa o refresh, que usa este módulo:
+    from curry_company import ingest
+
+    return enabled() or ingest.enabled()
+
+# Função para verificar se um objeto é uma seleção do banco local:
+def is_orders(frame):
+    """ Essa função verifica se o objeto recebido é uma seleção do banco local (Orders) ou um dataframe.
+
+        Input: Orders ou Dataframe
+        Output: True ou False
+    """
+    return isinstance(frame, Orders)
+
+# Função para obter o caminho do banco local de um CSV:
+def database_path(csv_path):
+    """ Essa função devolve o caminho do banco local correspondente ao CSV (mesmo nome, extensão .sqlite).
+
+        Input: caminho do CSV
+        Output: caminho do banco (ex.: dataset/train.csv -> dataset/train.sqlite)
+    """
+    return os.path.splitext(csv_path)[0] + '.sqlite'
+
+# Função para abrir uma conexão somente leitura com o banco local:
+def connect(path):
+    """ Essa função abre uma conexão somente leitura com o banco. Várias sessões e vários processos do Streamlit podem
+        consultar o mesmo arquivo ao mesmo tempo.
+
+        Input: caminho do banco
+        Output: sqlite3.Connection
+    """
+    return sqlite3.connect(f'file:{os.path.abspath(path)}?mode=ro', uri=True, check_same_thread=False)
+
+# Função para obter a versão do arquivo colunar registrada no banco:
+def source_version(cache_path):
+    """ Essa função gera o texto que identifica a versão do arquivo colunar (data de modificação e tamanho). O banco
+        registra a versão do arquivo colunar que ele reproduz; a versão muda a cada reconstrução e a cada lote acrescentado.
+        Com a ingestão em lotes e sem o arquivo colunar, o banco reproduz o próprio CSV (ver orders).
+
+        Input: caminho do arquivo colunar (ou do CSV)
+        Output: texto (ex.: '1686500000000000000:1234567')
+    """
+    stat = os.stat(cache_path)
+
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+# Função para verificar se o banco local precisa ser reconstruído:
+def database_is_stale(cache_path, path):
+    """ Essa função verifica se o banco está desatualizado em relação ao arquivo colunar do dataset: quando não existe,
+        quando foi gravado por outra versão do código (a versão fica em PRAGMA user_version) ou quando a versão do arquivo
+        colunar registrada nele (ver source_version) não é a atual.
+
+        Input: caminho do arquivo colunar, caminho do banco
+        Output: True ou False
+    """
+    if not os.path.exists(path):
+        return True
+
+    with closing(connect(path)) as connection:
+        if connection.execute('PRAGMA user_version').fetchone()[0] != store.CACHE_VERSION:
+            return True
+
+        # Bancos gerados antes do registro da versão não têm a tabela source:
+        try:
+            version = connection.execute('SELECT version FROM source').fetchone()[0]
+        except sqlite3.OperationalError:
+            return True
+
+    return version != source_version(cache_path)
+
+# Função para converter as colunas do dataframe limpo para o banco:
+def database_frame(df):
+    """ Essa função converte o dataframe limpo nas colunas gravadas no banco: as categorias viram texto e Order_Date vira
+        texto ISO (ver DATE_FORMAT).
+
+        Input: dataframe limpo
+        Output: Dataframe
+    """
+    columns = {col: df[col].astype(df[col].cat.categories.dtype)
+               for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+
+    columns['Order_Date'] = df['Order_Date'].dt.strftime(DATE_FORMAT)
+
+    return df.assign(**columns)
+
+# Função para gravar o dataframe limpo no banco local:
+def write_database(frames, path, cache_path):
+    """ Essa função grava os dataframes limpos (ver database_frame), um depois do outro, na tabela orders do banco, cria
+        os índices de INDEXED_COLUMNS e registra a versão do arquivo colunar de origem (ver source_version). Com um gerador
+        de lotes (ver ingest.clean_chunks), só um lote fica em memória por vez.
+        A gravação é feita num arquivo temporário que depois substitui o anterior.
+
+        Input: lista ou gerador de dataframes limpos, caminho do banco, caminho do arquivo colunar de origem
+        Output: Não tem return.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    connection = sqlite3.connect(tmp_path)
+
+    try:
+        for df in frames:
+            database_frame(df).to_sql('orders', connection, index=False, if_exists='append')
+
+        for col in INDEXED_COLUMNS:
+            connection.execute(f'CREATE INDEX "idx_{col}" ON orders ("{col}")')
+
+        connection.execute('CREATE TABLE source (version TEXT)')
+        connection.execute('INSERT INTO source VALUES (?)', [source_version(cache_path)])
+        connection.execute(f'PRAGMA user_version = {store.CACHE_VERSION}')
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(tmp_path, path)
+
+# Função para acrescentar pedidos ao banco local:
+def append_database(batch, path, cache_path):
+    """ Essa função insere os pedidos novos (ex.: um lote acrescentado pelo refresh) na tabela orders do banco e registra
+        a nova versão do arquivo colunar, numa única transação. Assim, o banco acompanha o arquivo colunar sem ser
+        reconstruído a cada lote; as consultas em andamento continuam vendo o banco anterior até o fim da transação.
+        Deve ser chamada com o banco atualizado em relação ao arquivo colunar anterior ao lote.
+
+        Input: dataframe limpo só com os pedidos novos, caminho do banco, caminho do arquivo colunar já com o lote
+        Output: Não tem return.
+    """
+    rows = database_frame(batch)
+
+    columns = ', '.join(f'"{col}"' for col in rows.columns)
+    placeholders = ', '.join('?' * len(rows.columns))
+
+    connection = sqlite3.connect(path)
+
+    try:
+        with connection:
+            connection.executemany(f'INSERT INTO orders ({columns}) VALUES ({placeholders})',
+                                   rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+            connection.execute('UPDATE source SET version = ?', [source_version(cache_path)])
+    finally:
+        connection.close()
+
+# Função para abrir a seleção dos pedidos pelos filtros da barra lateral:
+def orders(date_slider, traffic_options, path=DATASET_PATH):
+    """ Essa função devolve a seleção dos pedidos do banco local com Order_Date < date_slider e Road_traffic_density
+        em traffic_options. O banco é gerado a partir do arquivo colunar quando está desatualizado (só um processo
+        reconstrói; os demais continuam lendo o arquivo anterior até a troca). Os lotes acrescentados pelo refresh são
+        inseridos no banco existente (ver append_database), sem reconstrução.
+        Com a ingestão em lotes ligada (ver ingest.enabled), o banco é gerado a partir dos CSVs do dataset lidos em lotes
+        (ver ingest.clean_chunks e ingest.source_files) e o arquivo colunar não é gerado aqui: em nenhum momento a tabela
+        inteira fica em memória.
+
+        Input:
+            - date_slider: data limite selecionada (None para não filtrar)
+            - traffic_options: lista das condições de trânsito selecionadas (None para não filtrar)
+            - path: caminho do CSV (padrão: dataset/train.csv)
+        Output: Orders
+    """
+    # Importado aqui porque o ingest usa o refresh, que usa este módulo:
+    from curry_company import ingest
+
+    cache_path = store.cache_path(path)
+    db_path = database_path(path)
+    chunked = ingest.enabled()
+
+    with _build_lock:
+        if not chunked and store.cache_is_stale(path, cache_path):
+            build_cache(path)
+
+        # Sem o arquivo colunar (só com a ingestão em lotes), o banco acompanha a versão do CSV:
+        source = cache_path if not chunked or os.path.exists(cache_path) else path
+
+        if database_is_stale(source, db_path):
+            # A trava impede que um lote seja acrescentado (ver refresh) enquanto o banco é gerado:
+            with store.file_lock(cache_path):
+                source = cache_path if not chunked or os.path.exists(cache_path) else path
+
+                if database_is_stale(source, db_path):
+                    frames = ingest.clean_chunks(ingest.source_files(path)) if chunked else [store.read_cache(cache_path)]
+
+                    write_database(frames, db_path, source)
+
+    return Orders(db_path, date_slider, traffic_options)
+
+# Função para executar uma consulta de agregação:
+def query(orders, select, by):
+    """ Essa função executa SELECT <by>, <select> FROM orders WHERE <filtros> GROUP BY <by> ORDER BY <by>, com os valores
+        dos filtros passados como parâmetros. A coluna Order_Date do resultado volta a ser data.
+
+        Input: Orders, expressões do SELECT (texto), lista de colunas de agrupamento (pode ser vazia)
+        Output: Dataframe
+    """
+    columns = ', '.join(f'"{col}"' for col in by)
+
+    sql = f'SELECT {columns + ", " if by else ""}{select} FROM orders WHERE {orders.where}'
+
+    if by:
+        sql += f' GROUP BY {columns} ORDER BY {columns}'
+
+    with closing(connect(orders.path)) as connection:
+        df_aux = pd.read_sql_query(sql, connection, params=orders.params)
+
+    if 'Order_Date' in df_aux.columns:
+        df_aux['Order_Date'] = pd.to_datetime(df_aux['Order_Date'], format=DATE_FORMAT)
+
+    return df_aux
+
+# Função para contar pedidos por um agrupamento:
+def count_by(orders, by):
+    """ Essa função conta os pedidos agrupando por by (ver cube.count_by).
+
+        Input: Orders, lista de colunas de agrupamento
+        Output: Dataframe com as colunas de agrupamento e a coluna ID (quantidade de pedidos)
+    """
+    return query(orders, 'COUNT(*) AS "ID"', by)
+
+# Função para somar uma coluna numérica por um agrupamento:
+def group_sums(orders, by, col):
+    """ Essa função calcula, para cada grupo de by, a quantidade de pedidos (orders), a soma (<col>_sum) e a soma
+        dos quadrados (<col>_sumsq) da coluna col, as mesmas colunas do cubo (ver cube.stats_by).
+        As somas usam TOTAL, que devolve 0.0 (e não NULL, como o SUM) quando não há valores: com a seleção vazia, o
+        resultado continua numérico e a média fica indefinida (NaN), como no cubo.
+
+        Input: Orders, lista de colunas de agrupamento (pode ser vazia), coluna numérica
+        Output: Dataframe no formato do cubo
+    """
+    select = f'COUNT(*) AS orders, TOTAL("{col}") AS "{col}_sum", TOTAL("{col}" * "{col}") AS "{col}_sumsq"'
+
+    return query(orders, select, by)
+
+# Função para contar valores distintos por um agrupamento:
+def count_distinct(orders, by, col):
+    """ Essa função conta os valores distintos da coluna col (ex.: Delivery_person_ID) agrupando por by.
+
+        Input: Orders, lista de colunas de agrupamento (pode ser vazia), coluna
+        Output: Dataframe com as colunas de agrupamento e a coluna col (quantidade de valores distintos)
+    """
+    return query(orders, f'COUNT(DISTINCT "{col}") AS "{col}"', by)
+
+# Função para calcular a mediana de colunas numéricas por um agrupamento:
+def group_medians(orders, by, cols):
+    """ Essa função calcula a mediana de cada coluna de cols agrupando por by, como o median do pandas: os valores
+        vazios são ignorados e, com uma quantidade par de valores, a mediana é a média dos dois valores centrais.
+        O SQLite não tem mediana; os valores de cada grupo são numerados em ordem (ROW_NUMBER) e só os centrais
+        são lidos.
+
+        Input: Orders, lista de colunas de agrupamento, lista de colunas numéricas
+        Output: Dataframe com as colunas de agrupamento e uma coluna com a mediana de cada coluna de cols
+    """
+    columns = ', '.join(f'"{col}"' for col in by)
+
+    df_aux = None
+
+    with closing(connect(orders.path)) as connection:
+        for col in cols:
+            sql = f'''SELECT {columns}, AVG("{col}") AS "{col}"
+                      FROM (SELECT {columns}, "{col}",
+                                   ROW_NUMBER() OVER (PARTITION BY {columns} ORDER BY "{col}") AS position,
+                                   COUNT(*) OVER (PARTITION BY {columns}) AS n
+                            FROM orders WHERE {orders.where} AND "{col}" IS NOT NULL)
+                      WHERE position IN ((n + 1) / 2, (n + 2) / 2)
+                      GROUP BY {columns} ORDER BY {columns}'''
+
+            medians = pd.read_sql_query(sql, connection, params=orders.params)
+
+            df_aux = medians if df_aux is None else df_aux.merge(medians, on=list(by), how='outer')
+
+    return df_aux
+
+# Função para contar os pedidos de cada célula de uma grade de latitude/longitude:
+def grid_density(orders, lat_col, lon_col, cell_size=0.01):
+    """ Essa função faz o mesmo que geo.grid_density com os pontos (lat_col, lon_col) dos pedidos selecionados: a linha
+        e a coluna da célula de cada ponto são calculadas na consulta e os pontos são contados por célula.
+
+        Input: Orders, colunas de latitude e de longitude, cell_size (tamanho da célula em graus)
+        Output: arrays com a latitude e a longitude do centro de cada célula e a quantidade de pontos
+    """
+    # Arredondamento para baixo (floor), também para valores negativos:
+    def floor(col):
+        return f'(CAST("{col}" / {cell_size!r} AS INTEGER) - ("{col}" / {cell_size!r} < CAST("{col}" / {cell_size!r} AS INTEGER)))'
+
+    sql = f'''SELECT {floor(lat_col)} AS cell_row, {floor(lon_col)} AS cell_col, COUNT(*) AS points
+              FROM orders WHERE {orders.where}
+              GROUP BY cell_row, cell_col ORDER BY cell_row, cell_col'''
+
+    with closing(connect(orders.path)) as connection:
+        df_aux = pd.read_sql_query(sql, connection, params=orders.params)
+
+    return ((df_aux['cell_row'].to_numpy() + 0.5) * cell_size,
+            (df_aux['cell_col'].to_numpy() + 0.5) * cell_size,
+            df_aux['points'].to_numpy())
@@ -0,0 +1,358 @@
+#==============================================
+# Libraries
+#==============================================
+import contextlib
+import glob
+import json
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+#==============================================
+# Configurações
+#==============================================
+
+# Versão do conteúdo do arquivo colunar. Deve ser incrementada sempre que o clean_code mudar as colunas ou os tipos
+# gravados, para que arquivos gerados por versões anteriores sejam reconstruídos.
+CACHE_VERSION = 5
+
+# Partições do dataset limpo por período de Order_Date: cada período fica numa pasta period=AAAA-MM-DD (início do período).
+PARTITION_FIELD = 'period'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.date32())]), flavor='hive')
+
+# Arquivo de controle das partições (granularidade e versão), gravado por último:
+PARTITION_MARKER = '_partitions.json'
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para obter o caminho do arquivo colunar de um CSV:
+def cache_path(csv_path):
+    """ Essa função devolve o caminho do arquivo colunar correspondente ao CSV (mesmo nome, extensão .feather).
+
+        Input: caminho do CSV
+        Output: caminho do arquivo colunar (ex.: dataset/train.csv -> dataset/train.feather)
+    """
+    return os.path.splitext(csv_path)[0] + '.feather'
+
+# Função para verificar se o arquivo colunar precisa ser reconstruído:
+def cache_is_stale(csv_path, path):
+    """ Essa função verifica se o arquivo colunar está desatualizado em relação aos arquivos de origem.
+        O arquivo é considerado desatualizado quando não existe, quando foi gravado por outra versão do código
+        (CACHE_VERSION) ou quando a origem foi modificada depois dele. A origem é o CSV ou, se o arquivo foi gerado a
+        partir de vários arquivos (ver cache_sources), os arquivos do padrão: também fica desatualizado quando o padrão
+        passa a encontrar arquivos diferentes.
+
+        Input: caminho do CSV, caminho do arquivo colunar
+        Output: True ou False
+    """
+    if not os.path.exists(path):
+        return True
+
+    # Só o rodapé do arquivo é lido para obter o schema:
+    metadata = pa.ipc.open_file(path).schema.metadata or {}
+
+    if metadata.get(b'cache_version') != str(CACHE_VERSION).encode():
+        return True
+
+    sources = json.loads(metadata.get(b'sources', b'null'))
+
+    if sources is None:
+        return os.stat(csv_path).st_mtime_ns > os.stat(path).st_mtime_ns
+
+    files = sorted(glob.glob(sources['pattern']))
+
+    return files != sources['files'] or any(os.stat(file).st_mtime_ns > os.stat(path).st_mtime_ns for file in files)
+
+# Função para travar o arquivo colunar entre processos:
+@contextlib.contextmanager
+def file_lock(path):
+    """ Essa função trava o arquivo path para escrita enquanto o bloco with estiver em execução, também entre processos
+        (ex.: vários servidores do Streamlit ou a linha de comando do refresh usando o mesmo dataset). A trava é feita
+        num arquivo ao lado (path + '.lock') e é liberada pelo sistema se o processo terminar no meio do bloco.
+        O arquivo .lock não é apagado ao sair do bloco: apagá-lo permitiria que um processo travasse o arquivo antigo e
+        outro um arquivo novo com o mesmo nome ao mesmo tempo.
+
+        Exemplo:
+            with store.file_lock(cache_path):
+                ...
+
+        Input: caminho do arquivo a travar
+        Output: Não tem return.
+    """
+    with open(f'{path}.lock', 'a+b') as file:
+        if os.name == 'nt':
+            import msvcrt
+
+            file.seek(0)
+
+            # O LK_LOCK desiste depois de alguns segundos; tenta de novo até conseguir:
+            while True:
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+# Função para gravar o dataframe limpo no formato colunar:
+def write_cache(df, path, appended=(), sources=None):
+    """ Essa função grava o dataframe limpo num arquivo Feather (Arrow IPC) sem compressão, o que permite a leitura
+        por memory map. Os tipos do dataframe são preservados: as colunas de categoria do schema são gravadas como
+        dicionário e Order_Date como datetime.
+        A gravação é feita num arquivo temporário que depois substitui o anterior, então um processo que esteja
+        lendo o cache nunca vê um arquivo pela metade.
+        Os nomes dos lotes acrescentados ao CSV original (ver refresh) são gravados no próprio arquivo, junto com os
+        dados, para que um lote nunca fique registrado sem os seus pedidos ou o contrário.
+        Da mesma forma, quando o dataset vem de vários arquivos (ver data.build_cache), o padrão e a lista de arquivos
+        ficam no próprio arquivo colunar.
+
+        Input: dataframe limpo, caminho do arquivo colunar, appended (nomes dos lotes já acrescentados),
+               sources (dicionário {'pattern': padrão, 'files': arquivos} ou None para o CSV)
+        Output: Não tem return.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata,
+                                           b'cache_version': str(CACHE_VERSION).encode(),
+                                           b'appended': json.dumps(list(appended)).encode(),
+                                           b'sources': json.dumps(sources).encode()})
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+
+    os.replace(tmp_path, path)
+
+# Função para obter os lotes já acrescentados ao arquivo colunar:
+def appended_files(path):
+    """ Essa função devolve os nomes dos lotes acrescentados ao arquivo colunar depois da limpeza do CSV original
+        (ver write_cache). Só o rodapé do arquivo é lido.
+
+        Input: caminho do arquivo colunar
+        Output: lista de nomes de arquivos
+    """
+    metadata = pa.ipc.open_file(path).schema.metadata or {}
+
+    return json.loads(metadata.get(b'appended', b'[]'))
+
+# Função para obter os arquivos de origem do arquivo colunar:
+def cache_sources(path):
+    """ Essa função devolve o padrão e os arquivos de origem de um arquivo colunar gerado a partir de vários arquivos
+        (ver write_cache). Só o rodapé do arquivo é lido.
+
+        Input: caminho do arquivo colunar
+        Output: dicionário {'pattern': padrão, 'files': arquivos} ou None (arquivo gerado a partir do CSV ou inexistente)
+    """
+    if not os.path.exists(path):
+        return None
+
+    metadata = pa.ipc.open_file(path).schema.metadata or {}
+
+    return json.loads(metadata.get(b'sources', b'null'))
+
+# Função para ler o arquivo colunar:
+def read_cache(path):
+    """ Essa função lê o arquivo colunar por memory map. As colunas numéricas, de data e os códigos das categorias
+        são entregues sem cópia, apontando para o arquivo mapeado (arrays somente leitura).
+
+        Input: caminho do arquivo colunar
+        Output: Dataframe limpo
+    """
+    table = feather.read_table(path, memory_map=True)
+
+    return table.to_pandas(split_blocks=True)
+
+# Função para obter a pasta das partições de um CSV:
+def partition_path(csv_path):
+    """ Essa função devolve a pasta das partições correspondente ao CSV (mesmo nome, extensão .parts).
+
+        Input: caminho do CSV
+        Output: caminho da pasta (ex.: dataset/train.csv -> dataset/train.parts)
+    """
+    return os.path.splitext(csv_path)[0] + '.parts'
+
+# Função para obter o início do período de cada data:
+def period_start(dates, granularity):
+    """ Essa função devolve o início do período de cada data: o próprio dia (granularity='day') ou a segunda-feira
+        da semana (granularity='week').
+
+        Input: Series de datas, granularidade ('day' ou 'week')
+        Output: Series de datas
+    """
+    dates = pd.Series(dates).dt.normalize()
+
+    if granularity == 'week':
+        return dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')
+
+    if granularity == 'day':
+        return dates
+
+    raise ValueError(f"Granularidade inválida: {granularity} (use 'day' ou 'week').")
+
+# Função para ler o arquivo de controle das partições:
+def partition_info(path):
+    """ Essa função lê o arquivo de controle da pasta de partições.
+
+        Input: pasta das partições
+        Output: dicionário com granularity e cache_version, ou None se a pasta não estiver completa
+    """
+    try:
+        with open(os.path.join(path, PARTITION_MARKER)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+# Função para verificar se as partições precisam ser reconstruídas:
+def partitions_are_stale(cache_path, path):
+    """ Essa função verifica se as partições estão desatualizadas em relação ao arquivo colunar do dataset:
+        quando não existem (ou a gravação não terminou), quando foram gravadas por outra versão do código ou
+        quando o arquivo colunar foi modificado depois delas.
+
+        Input: caminho do arquivo colunar, pasta das partições
+        Output: True ou False
+    """
+    info = partition_info(path)
+
+    if info is None or info.get('cache_version') != CACHE_VERSION:
+        return True
+
+    return os.stat(cache_path).st_mtime_ns > os.stat(os.path.join(path, PARTITION_MARKER)).st_mtime_ns
+
+# Função para gravar o arquivo de controle das partições:
+def write_partition_marker(path, granularity):
+    """ Essa função grava (ou regrava) o arquivo de controle, o que marca as partições como atualizadas. O arquivo é
+        gravado ao lado e trocado de uma vez (os.replace), então uma leitura nunca o encontra pela metade.
+
+        Input: pasta das partições, granularidade
+        Output: Não tem return.
+    """
+    marker = os.path.join(path, PARTITION_MARKER)
+
+    with open(f'{marker}.{os.getpid()}.tmp', 'w') as file:
+        json.dump({'granularity': granularity, 'cache_version': CACHE_VERSION}, file)
+
+    os.replace(f'{marker}.{os.getpid()}.tmp', marker)
+
+# Função para gravar os arquivos dos períodos:
+def write_period_files(df, path, granularity, basename='base'):
+    """ Essa função grava os pedidos limpos na pasta path, um arquivo Arrow IPC por período de Order_Date
+        (pastas period=AAAA-MM-DD). Arquivos com outro basename já existentes na pasta são mantidos.
+
+        Input: dataframe limpo, pasta, granularidade ('day' ou 'week'), basename (prefixo dos arquivos)
+        Output: Não tem return.
+    """
+    period = period_start(df['Order_Date'], granularity)
+
+    table = pa.Table.from_pandas(df.assign(**{PARTITION_FIELD: period.dt.date}), preserve_index=False)
+
+    ds.write_dataset(table, path, format='ipc', partitioning=PARTITIONING,
+                     basename_template=f'{basename}-{{i}}.arrow', existing_data_behavior='overwrite_or_ignore')
+
+# Função para acrescentar pedidos às partições:
+def write_partitions(df, path, granularity, basename='base'):
+    """ Essa função acrescenta um lote de pedidos limpos às partições (ver refresh): os arquivos dos períodos do lote
+        são gravados numa pasta temporária e movidos um a um para as pastas dos períodos (os.replace), então uma leitura
+        em andamento nunca encontra um arquivo pela metade. Os arquivos existentes são mantidos e o arquivo de controle
+        é regravado no final.
+
+        Input: dataframe limpo, pasta das partições, granularidade ('day' ou 'week'), basename (prefixo dos arquivos)
+        Output: Não tem return.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    write_period_files(df, tmp_path, granularity, basename)
+
+    for folder, _, names in os.walk(tmp_path):
+        target = os.path.join(path, os.path.relpath(folder, tmp_path))
+        os.makedirs(target, exist_ok=True)
+
+        for name in names:
+            os.replace(os.path.join(folder, name), os.path.join(target, name))
+
+    shutil.rmtree(tmp_path)
+
+    write_partition_marker(path, granularity)
+
+# Função para gerar as partições a partir do dataframe limpo:
+def build_partitions(df, path, granularity='week'):
+    """ Essa função grava todas as partições numa pasta temporária e só depois troca a pasta anterior por ela
+        (a anterior é renomeada e apagada depois da troca).
+
+        Input: dataframe limpo, pasta das partições, granularidade ('day' ou 'week')
+        Output: Não tem return.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    old_path = f'{path}.{os.getpid()}.old.tmp'
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+    write_period_files(df, tmp_path, granularity)
+    write_partition_marker(tmp_path, granularity)
+
+    if os.path.exists(path):
+        os.replace(path, old_path)
+
+    os.replace(tmp_path, path)
+
+    shutil.rmtree(old_path, ignore_errors=True)
+
+# Função para ler as partições com filtros:
+def read_partitions(path, start=None, end=None, traffic_options=None):
+    """ Essa função lê os pedidos das partições aplicando os filtros na própria leitura:
+        - start <= Order_Date < end: só as pastas dos períodos que cruzam esse intervalo são abertas
+        - Road_traffic_density em traffic_options: filtrado em cada arquivo, antes da conversão para pandas
+        Os filtros com None não são aplicados. As linhas saem em ordem de período.
+
+        Input: pasta das partições, start, end (datas), traffic_options (lista das condições de trânsito)
+        Output: Dataframe limpo filtrado
+    """
+    granularity = partition_info(path)['granularity']
+
+    dataset = ds.dataset(path, format='ipc', partitioning=PARTITIONING)
+
+    expression = None
+    conditions = []
+
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions.append(ds.field(PARTITION_FIELD) >= pa.scalar(period_start([start], granularity)[0].date(), pa.date32()))
+        conditions.append(ds.field('Order_Date') >= pa.scalar(start, pa.timestamp('ns')))
+
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions.append(ds.field(PARTITION_FIELD) <= pa.scalar(period_start([end], granularity)[0].date(), pa.date32()))
+        conditions.append(ds.field('Order_Date') < pa.scalar(end, pa.timestamp('ns')))
+
+    if traffic_options is not None:
+        # O tipo é informado para que a lista vazia (nenhuma condição selecionada) também funcione:
+        conditions.append(ds.field('Road_traffic_density').isin(pa.array(list(traffic_options), pa.string())))
+
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    columns = [name for name in dataset.schema.names if name != PARTITION_FIELD]
+
+    table = dataset.to_table(columns=columns, filter=expression)
+
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,143 @@
+#==============================================
+# Libraries
+#==============================================
+import numpy as np
+import pandas as pd
+
+#==============================================
+# Configurações
+#==============================================
+
+# Quantidade padrão de linhas por página das tabelas paginadas:
+PAGE_SIZE = 50
+
+# Rótulos da ordenação na caixa de seleção (a primeira opção mantém a ordem da tabela):
+NO_SORT = 'Ordem original'
+ASCENDING = '↑'
+DESCENDING = '↓'
+
+# O streamlit só é importado em paged_table, para que a busca, a ordenação e a paginação possam ser usadas fora das
+# páginas (ex.: nos benchmarks), como em profiling.
+
+#==============================================
+# Funções
+#==============================================
+
+# Função para filtrar as linhas pelo início do texto de uma coluna:
+def search(df, column, prefix):
+    """ Essa função devolve as linhas cujo valor de column começa com prefix (ex.: o início do ID do entregador).
+        Se a tabela estiver ordenada por column (ex.: as tabelas por entregador, ordenadas pelo ID), as linhas com o
+        prefixo formam um bloco contínuo, encontrado por busca binária; senão, o início de cada valor é comparado.
+
+        Input: Dataframe, nome da coluna de texto, prefix (texto; vazio para todas as linhas)
+        Output: Dataframe com as linhas encontradas
+    """
+    if not prefix:
+        return df
+
+    values = df[column].astype(str)
+
+    if values.is_monotonic_increasing:
+        ids = values.to_numpy()
+
+        start = np.searchsorted(ids, prefix, side='left')
+        end = np.searchsorted(ids, prefix + '\U0010ffff', side='left')
+
+        return df.iloc[start:end]
+
+    return df.loc[values.str.startswith(prefix).to_numpy(), :]
+
+# Função para obter as primeiras linhas da tabela numa ordenação:
+def sorted_head(df, column, ascending=True, count=None):
+    """ Essa função devolve as count primeiras linhas da tabela ordenada por column, com os valores vazios (NaN) no fim
+        e, nos empates, a ordem original (como sort_values com kind='stable').
+        Para colunas numéricas, só as count primeiras linhas são ordenadas (nsmallest/nlargest, seleção parcial): a
+        primeira página de uma tabela grande não exige ordenar a tabela inteira.
+
+        Input: Dataframe, nome da coluna, ascending (True ou False), count (quantidade de linhas; None para todas)
+        Output: Dataframe ordenado
+    """
+    values = df[column]
+
+    if count is None or count >= len(df) or not pd.api.types.is_numeric_dtype(values):
+        return df.sort_values(column, ascending=ascending, kind='stable', na_position='last').iloc[:count]
+
+    filled = df.loc[values.notna().to_numpy(), :]
+
+    selected = filled.nsmallest(count, column, keep='first') if ascending else filled.nlargest(count, column, keep='first')
+
+    # Reordena as linhas escolhidas pela posição original, para que os empates sigam a ordem da tabela:
+    head = df.iloc[np.sort(df.index.get_indexer(selected.index))].sort_values(column, ascending=ascending, kind='stable')
+
+    if len(head) < count:
+        head = pd.concat([head, df.loc[values.isna().to_numpy(), :].iloc[:count - len(head)]])
+
+    return head
+
+# Função para calcular a quantidade de páginas:
+def page_count(df, size=PAGE_SIZE):
+    """ Essa função calcula a quantidade de páginas da tabela (pelo menos uma, mesmo sem linhas).
+
+        Input: Dataframe, size (linhas por página)
+        Output: int
+    """
+    return max(1, -(-len(df) // size))
+
+# Função para obter uma página da tabela:
+def page(df, number=1, size=PAGE_SIZE, sort=None, ascending=True):
+    """ Essa função devolve só as linhas da página pedida, na ordenação pedida (ver sorted_head).
+
+        Input: Dataframe, number (número da página, começa em 1), size (linhas por página),
+               sort (coluna da ordenação ou None para a ordem da tabela), ascending (True ou False)
+        Output: Dataframe com a página (index resetado)
+    """
+    start = (number - 1) * size
+
+    if sort is not None:
+        df = sorted_head(df, sort, ascending, start + size)
+
+    return df.iloc[start:start + size].reset_index(drop=True)
+
+# Função para exibir uma tabela paginada:
+def paged_table(df, key, search_column=None, sort_columns=None, size=PAGE_SIZE):
+    """ Essa função exibe a tabela com busca, ordenação e paginação feitas no servidor: a tabela inteira fica no
+        processo e só as linhas da página escolhida são enviadas ao navegador pelo st.dataframe.
+        Os controles ficam acima da tabela: a busca pelo início do texto de search_column (se houver), a ordenação
+        por uma das sort_columns e o número da página; a quantidade de linhas encontradas fica abaixo.
+
+        Exemplo:
+            tables.paged_table(df_aux, 'rating_by_courier', search_column='Delivery_person_ID')
+
+        Input:
+            - df: Dataframe completo (ex.: uma agregação guardada no cache)
+            - key: prefixo das chaves dos controles, único na página
+            - search_column: coluna de texto da busca ou None (sem busca)
+            - sort_columns: colunas oferecidas na ordenação (padrão: todas)
+            - size: linhas por página
+        Output: Não tem return.
+    """
+    import streamlit as st
+
+    sort_columns = list(df.columns if sort_columns is None else sort_columns)
+    options = [NO_SORT] + [f'{col} {arrow}' for col in sort_columns for arrow in (ASCENDING, DESCENDING)]
+
+    if search_column is None:
+        col2, col3 = st.columns([2, 1])
+        prefix = ''
+    else:
+        col1, col2, col3 = st.columns([2, 2, 1])
+        prefix = col1.text_input(f'Buscar {search_column} (início)', key=f'{key}_search').strip()
+
+    order = col2.selectbox('Ordenar por', options, key=f'{key}_sort')
+
+    found = search(df, search_column, prefix) if search_column is not None else df
+
+    number = col3.number_input('Página', min_value=1, max_value=page_count(found, size), value=1, step=1, key=f'{key}_page')
+
+    sort, ascending = (None, True) if order == NO_SORT else (order[:-2], order.endswith(ASCENDING))
+
+    st.dataframe(page(found, number, size, sort, ascending), use_container_width=True, hide_index=True)
+
+    start = (number - 1) * size
+
+    st.caption(f'{min(start + 1, len(found))}–{min(start + size, len(found))} de {len(found)} linhas')
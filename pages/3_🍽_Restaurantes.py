@@ -1,155 +1,60 @@
 #==============================================
 # Libraries
 #==============================================
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import folium
-from haversine import haversine
 import streamlit as st
 from PIL import Image
-from streamlit_folium import folium_static
 import numpy as np
 from datetime import datetime
+from curry_company import figures, layout, metrics, profiling, sql, tables
+from curry_company.cache import cached
+from curry_company.cube import load_cube
+from curry_company.data import filter_orders, filter_state
+from curry_company.distinct import load_courier_sets
+from curry_company.refresh import refresh
 
 #==============================================
 # Funções
 #==============================================
 
-# Função para limpar o dataframe:
-def clean_code( df ):
-    """ Essa função tem a responsabilidade de limpar o dataframe.
-    
-        Tipos de limpeza:
-        1. Remoção dos NaN
-        2. Remoção dos espaços das variáveis de texto
-        3. Mudança do tipo da coluna de dados
-        4. Formatação da coluna de datas
-        5. Limpeza da coluna de tempo (remoção do texto da variável numérica)
-        
-        
-        Também foi resetado o index.
-        
-        Imput: Dataframe
-        Output: Dataframe    
-    """
-
-    # Limpeza dos dados e transformação de variáveis:
-    # Eliminando 'NaN ':
-    df = df.loc[df['Delivery_person_Ratings'] != 'NaN ', :]
-    df = df.loc[df['Weatherconditions'] != 'NaN ', :]
-    df = df.loc[df['Road_traffic_density'] != 'NaN ', :]
-    df = df.loc[df['multiple_deliveries'] != 'NaN ', :]
-    df = df.loc[df['Festival'] != 'NaN ', :]
-    df = df.loc[df['City'] != 'NaN ', :]
-    df = df.loc[df['Delivery_person_Age'] != 'NaN ', :]
-
-    # Eliminando espaço no final das strings:
-    df['City'] = df['City'].str.strip()
-    df['Delivery_person_ID'] = df['Delivery_person_ID'].str.strip()
-    df['Road_traffic_density'] = df['Road_traffic_density'].str.strip()
-    df['Type_of_order'] = df['Type_of_order'].str.strip()
-    df['Type_of_vehicle'] = df['Type_of_vehicle'].str.strip()
-    df['Festival'] = df['Festival'].str.strip()
-    df['City'] = df['City'].str.strip()
-
-    # # Alterando variáveis de objeto para número:
-    df['Delivery_person_Age'] = df['Delivery_person_Age'].astype(int)
-    df['Delivery_person_Ratings'] = df['Delivery_person_Ratings'].astype(float)
-    df['multiple_deliveries'] = df['multiple_deliveries'].astype(int)
-
-    # Alterando variáveis de objeto para data:
-    df['Order_Date'] = pd.to_datetime(df['Order_Date'], format='%d-%m-%Y')
-
-    # Limpando a coluna Time_taken:
-    df['Time_taken(min)'] = df['Time_taken(min)'].apply(lambda x: x.split('(min)')[1])
-    df['Time_taken(min)'] = df['Time_taken(min)'].astype(int)
-
-    # Resetando o index:
-    df = df.reset_index(drop=True)
-    
-    return df
-
 # Função para para calcular e gerar um gráfico da distância média dos resturantes e dos locais de entrega:
-def distance(df, fig):
-    """ Essa função tem por objetivo calcular a distância média dos resturantes e dos locais de entrega e gerar um gráfico de pizza. Ela utiliza as colunas
-        Restaurant_latitude, Restaurant_longitude, Delivery_location_latitude e Delivery_location_longitude para calcular a distância e armazenar numa coluna
-        criada chamada distance. Em seguida, a média das distâncias da coluna distance é calculada e o valor arredondado considerando 2 casas decimais.
+def distance(df, state, fig):
+    """ Essa função tem por objetivo calcular a distância média dos resturantes e dos locais de entrega e gerar um gráfico de pizza. Ela utiliza a coluna
+        distance, calculada uma única vez na limpeza dos dados (ver curry_company.geo.haversine_distance). Em seguida, a média das distâncias da coluna
+        distance é calculada e o valor arredondado considerando 2 casas decimais.
+        As médias vêm de metrics.avg_distance e metrics.distance_by_city, guardadas no cache de agregações.
     
-        Input: dataframe
+        Input: dataframe de pedidos ou cubo
+            - state: estado normalizado dos filtros
             - fig = True ou False
         Output: float ou gráfico
     """
     if fig == False:
-    
-        cols = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
 
-        df['distance'] = df.loc[:, cols].apply(lambda x: 
-                                   haversine((x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                       (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1)
-
-        avg_distance = np.round(df['distance'].mean(), 2)
+        avg_distance = np.round(cached(metrics.avg_distance, df, state), 2)
         
         return avg_distance
         
     else:
 
-        cols = ['Restaurant_latitude', 'Restaurant_longitude', 'Delivery_location_latitude', 'Delivery_location_longitude']
-
-        df['distance'] = df.loc[:, cols].apply(lambda x: 
-                                       haversine( (x['Restaurant_latitude'], x['Restaurant_longitude']),
-                                           (x['Delivery_location_latitude'], x['Delivery_location_longitude'])), axis=1)
-
-        avg_distance = df.loc[:,['City', 'distance']].groupby('City').mean().reset_index()
+        avg_distance = cached(metrics.distance_by_city, df, state)
 
         fig = go.Figure(data=[go.Pie(labels=avg_distance['City'], values=avg_distance['distance'], pull=[0, 0.1, 0])])
     
         return fig
 
-# Função para calcular o tempo médio de entrega durantes os Festivais:
-def avg_std_time_delivery(df, festival, op):
-    """ 
-        Essa função calcula o tempo médio e o desvio padrão do tempo de entrega.
-        Parâmetros:
-            Input:
-                - df: Dataframe com os dados necessários para o cálculo.
-                - festival: A ocorrência ou não do festival durante as entregas
-                    'Yes': ocorreu festival
-                    'No': não ocorreu festival.
-                - op: Tipo de operação que precisa ser calculada
-                    'avg_time': Calcula o  tempo médio
-                    'std_time': Calcula o desvio padrão do tempo.
-                
-            Output:
-                - df: Dataframe com 2 colunas e 1 linha
-    """
-
-
-    df_aux = df.loc[:, ['Time_taken(min)', 'Festival']].groupby('Festival').agg({'Time_taken(min)' : ['mean', 'std']})
-
-    df_aux.columns = ['avg_time', 'std_time']
-
-    df_aux = df_aux.reset_index()
-
-    df_aux = np.round(df_aux.loc[df_aux['Festival'] == festival, op], 2)
-
-    return df_aux
-
 # Função para gerar um gráfico  do tempo médio e o desvio padrão de entrega por cidade:
-def avg_std_time_graph(df):  
+def avg_std_time_graph(time_stats):  
     """
         Essa função gera um gráfico de barras com desvio padrão do tempo de entrega por cidade.
         Não exibe o gráfico, é preciso um comando separado para isso.
         
-        Input: dataframe
+        Input: resultado de metrics.time_stats (inclui o agrupamento por City)
         Output: o gráfico gerado
         
     """   
-    df_aux = df.loc[:, ['City', 'Time_taken(min)']].groupby('City').agg({'Time_taken(min)': ['mean', 'std']})
-
-    df_aux.columns = ['avg_time', 'std_time']
-
-    df_aux = df_aux.reset_index()
+    df_aux = metrics.stats_table(time_stats, ('City',))
 
     fig = go.Figure()
 
@@ -163,21 +68,15 @@ def avg_std_time_graph(df):
     return fig
 
 # Função para gerar um gráfico do tempo médio e o desvio padrão de entrega por cidade e tipo de tráfego:
-def avg_std_time_on_traffic(df):
+def avg_std_time_on_traffic(time_stats):
     """
         Essa função tem por objetivo gerar um gráfico do tempo médio e o desvio padrão de entrega por cidade e tipo de tráfego.
         Não exibe o gráfico. É preciso um comando separado para isso.
         
-        Input: dataframe
+        Input: resultado de metrics.time_stats (inclui o agrupamento por City e Road_traffic_density)
         Output: O gráfico gerado.    
     """
-    df_aux = (df.loc[:, ['City', 'Time_taken(min)', 'Road_traffic_density']]
-                .groupby(['City', 'Road_traffic_density'])
-                .agg( {'Time_taken(min)': ['mean', 'std']}))
-
-    df_aux.columns = ['avg_time', 'std_time']
-
-    df_aux = df_aux.reset_index()
+    df_aux = metrics.stats_table(time_stats, ('City', 'Road_traffic_density'))
 
     fig = px.sunburst(df_aux, path=['City', 'Road_traffic_density'],
                       values='avg_time', color='std_time',
@@ -191,164 +90,176 @@ def avg_std_time_on_traffic(df):
 #==============================================
 # Import dataset
 #==============================================
-df_original = pd.read_csv('dataset/train.csv')
+# Perfil de desempenho opcional (barra lateral ou CURRY_COMPANY_PROFILE=1, ver curry_company.profiling):
+profiling.start('Restaurantes')
 
-#==============================================
-# Limpeza dos dados
-#==============================================
-df = clean_code(df_original)
+try:
+    # Novos lotes de pedidos da pasta dataset/incoming, se houver:
+    with profiling.stage('refresh'):
+        refresh()
 
-#==============================================
-# Configuração da largura da página
-#==============================================
-st.set_page_config(page_title='Visão Restaurantes', page_icon='🍽', layout='wide')
+    #==============================================
+    # Configuração da largura da página
+    #==============================================
+    st.set_page_config(page_title='Visão Restaurantes', page_icon='🍽', layout='wide')
 
-#==============================================
-# Barra Lateral
-#==============================================
-st.markdown('# Marketplace - Visão Restaurantes')
+    #==============================================
+    # Barra Lateral
+    #==============================================
+    st.markdown('# Marketplace - Visão Restaurantes')
 
-image = Image.open('logo.png')
-st.sidebar.image(image, width=120)
+    image = Image.open('logo.png')
+    st.sidebar.image(image, width=120)
 
-st.sidebar.markdown('# Curry Company')
-st.sidebar.markdown('## Fastest Delivery in Town')
-st.sidebar.markdown("""___""")
+    st.sidebar.markdown('# Curry Company')
+    st.sidebar.markdown('## Fastest Delivery in Town')
+    st.sidebar.markdown("""___""")
 
-st.sidebar.markdown('## Selecione uma data limite')
+    st.sidebar.markdown('## Selecione uma data limite')
 
-date_slider = st.sidebar.slider('Até qual valor?',
-                                value=datetime(2022, 4, 13),
-                                min_value=datetime(2022, 2, 11),
-                                max_value=datetime(2022, 4, 6),
-                                format='DD-MM-YYYY')
+    date_slider = st.sidebar.slider('Até qual valor?',
+                                    value=datetime(2022, 4, 13),
+                                    min_value=datetime(2022, 2, 11),
+                                    max_value=datetime(2022, 4, 6),
+                                    format='DD-MM-YYYY')
 
-st.sidebar.markdown("""___""")
+    st.sidebar.markdown("""___""")
 
-traffic_options = st.sidebar.multiselect('Quais as condições do trânsito?',
-                                        ['Low', 'Medium', 'High', 'Jam'],
-                                         default=['Low', 'Medium', 'High', 'Jam'])
+    traffic_options = st.sidebar.multiselect('Quais as condições do trânsito?',
+                                            ['Low', 'Medium', 'High', 'Jam'],
+                                             default=['Low', 'Medium', 'High', 'Jam'])
 
-st.sidebar.markdown("""___""")
+    st.sidebar.markdown("""___""")
 
-st.sidebar.markdown('### Powered by CDS')
+    profiling.sidebar_toggle()
 
-# Filtro de data:
-linhas_selecionadas = df['Order_Date'] < date_slider
-df = df.loc[linhas_selecionadas, :]
+    st.sidebar.markdown("""___""")
 
-# Filtro de trânsito:
-linhas_selecionadas = df['Road_traffic_density'].isin(traffic_options)
-df = df.loc[linhas_selecionadas, :]
+    st.sidebar.markdown('### Powered by CDS')
 
-#==============================================
-# Layout no streamlit
-#==============================================
-tab1, tab2, tab3 = st.tabs(['Visão Geral', '_', '_'])
+    # Fonte das agregações: o banco local, se CURRY_COMPANY_BACKEND=sqlite (ver curry_company.sql), ou os pré-agregados
+    # em memória: o cubo diário (pedidos resumidos por dia, cidade, tráfego, festival, tipo de pedido e clima) e os
+    # conjuntos de entregadores por dia e trânsito (ver curry_company.distinct):
+    with profiling.stage('pre_aggregates'):
+        if sql.enabled():
+            cube = couriers = sql.orders(date_slider, traffic_options)
+        else:
+            cube = filter_orders(load_cube(), date_slider, traffic_options)
+            couriers = load_courier_sets().filter(date_slider, traffic_options)
+
+    # Chave das agregações e dos gráficos em cache (ver curry_company.figures):
+    state = filter_state(date_slider, traffic_options)
+
+    #==============================================
+    # Layout no streamlit
+    #==============================================
+    # Só a aba escolhida é calculada (ver curry_company.layout.tab_selector):
+    aba = layout.tab_selector(['Visão Geral', '_', '_'], 'restaurantes_tab')
 
-with tab1:
-    with st.container():
-        st.markdown('## Overall metrics')
+    if aba == 'Visão Geral':
+        # Tempo de entrega de todos os agrupamentos da página, calculado numa única passada sobre o cubo:
+        time_stats = cached(metrics.time_stats, cube, state, metrics.TIME_DIMS)
+
+        with st.container():
+            st.markdown('## Overall metrics')
         
-        col1, col2, col3 = st.columns(3)
+            col1, col2, col3 = st.columns(3)
         
-        with col1:
+            with col1:
             
-            # A quantidade de entregadores únicos:
+                # A quantidade de entregadores únicos:
             
-            delivery_unique = len(df.loc[:, 'Delivery_person_ID'].unique())
+                delivery_unique = cached(metrics.unique_couriers, couriers, state)
             
-            col1.metric('Entregadores únicos', delivery_unique)
+                col1.metric('Entregadores únicos', delivery_unique)
             
-        with col2:
+            with col2:
             
-            # A distância média dos resturantes e dos locais de entrega:
+                # A distância média dos resturantes e dos locais de entrega:
             
-            avg_distance = distance(df, fig=False)
+                avg_distance = distance(cube, state, fig=False)
             
-            col2.metric('Distância média das entregas', avg_distance)
+                col2.metric('Distância média das entregas', avg_distance)
 
-        with col3:
+            with col3:
                 
-            # O tempo médio de entrega durantes os Festivais:
+                # O tempo médio de entrega durantes os Festivais:
             
-            df_aux = avg_std_time_delivery(df, festival='Yes', op='avg_time')
+                df_aux = metrics.festival_time(time_stats, festival='Yes', op='avg_time')
             
-            col3.metric('Tempo médio de entrega com o festival', df_aux)
+                col3.metric('Tempo médio de entrega com o festival', df_aux)
         
-    with st.container():
-        col4, col5, col6 = st.columns(3)
+        with st.container():
+            col4, col5, col6 = st.columns(3)
         
-        with col4:
+            with col4:
             
-            # O desvio padrão das entrega durantes os Festivais:
+                # O desvio padrão das entrega durantes os Festivais:
             
-            df_aux = avg_std_time_delivery(df, 'Yes', 'std_time')
+                df_aux = metrics.festival_time(time_stats, 'Yes', 'std_time')
             
-            col4.metric('Desvio padrão das entregas com o festival', df_aux)
+                col4.metric('Desvio padrão das entregas com o festival', df_aux)
         
-        with col5:
+            with col5:
             
-             # O tempo médio de entrega sem os Festivais:
+                 # O tempo médio de entrega sem os Festivais:
             
-            df_aux = avg_std_time_delivery(df, 'No', 'avg_time')
+                df_aux = metrics.festival_time(time_stats, 'No', 'avg_time')
             
-            col5.metric('Tempo médio de entrega sem o festival', df_aux)
+                col5.metric('Tempo médio de entrega sem o festival', df_aux)
         
-        with col6:
+            with col6:
             
-            # O desvio padrão das entrega sem os Festivais:
+                # O desvio padrão das entrega sem os Festivais:
             
-            df_aux = avg_std_time_delivery(df, 'No', 'std_time')
+                df_aux = metrics.festival_time(time_stats, 'No', 'std_time')
             
-            col6.metric('Desvio padrão das entregas sem o festival', df_aux)
+                col6.metric('Desvio padrão das entregas sem o festival', df_aux)
     
-    with st.container():
-        st.markdown("""___""")
-        st.markdown('## Tempo médio de entrega por cidade')
+        with st.container():
+            st.markdown("""___""")
+            st.markdown('## Tempo médio de entrega por cidade')
         
-        col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
         
-        with col1:
+            with col1:
             
-            # O tempo médio e o desvio padrão de entrega por cidade:
+                # O tempo médio e o desvio padrão de entrega por cidade:
                 
-            fig = avg_std_time_graph(df)
-
-            st.plotly_chart(fig, use_container_width = True)
+                with profiling.stage('avg_std_time_graph'):
+                    figures.chart('Restaurantes.avg_std_time_graph', state, avg_std_time_graph, time_stats)
             
-        with col2:
+            with col2:
             
-            # O tempo médio e o desvio padrão de entrega por cidade e tipo de pedido:
+                # O tempo médio e o desvio padrão de entrega por cidade e tipo de pedido:
                 
-            df_aux = (df.loc[:, ['City', 'Time_taken(min)', 'Type_of_order']]
-                        .groupby(['City', 'Type_of_order'])
-                        .agg({'Time_taken(min)': ['mean', 'std']}))
+                with profiling.stage('time_by_city_order'):
+                    df_aux = metrics.stats_table(time_stats, ('City', 'Type_of_order')).rename(columns={'avg_time': 'mean_time'})
 
-            df_aux.columns = ['mean_time', 'std_time']
-
-            df_aux = df_aux.reset_index()
-
-            st.dataframe(df_aux, use_container_width=True)
+                    # Ordenação e paginação no servidor; só a página escolhida vai para o navegador:
+                    tables.paged_table(df_aux, 'time_by_city_order')
                 
-    with st.container():
-        st.markdown("""___""")
-        st.markdown('## Distribuição do tempo')
+        with st.container():
+            st.markdown("""___""")
+            st.markdown('## Distribuição do tempo')
         
-        col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
         
-        with col1:
+            with col1:
 
-            # A distância média dos resturantes e dos locais de entrega:
-            
-            fig = distance(df, fig=True)
+                # A distância média dos resturantes e dos locais de entrega:
             
-            st.plotly_chart(fig, use_container_width=True)
+                with profiling.stage('distance'):
+                    figures.chart('Restaurantes.distance', state, distance, cube, state, True)
         
-        with col2:
+            with col2:
                       
-             # O tempo médio e o desvio padrão de entrega por cidade e tipo de tráfego:
+                 # O tempo médio e o desvio padrão de entrega por cidade e tipo de tráfego:
                 
-            fig = avg_std_time_on_traffic(df)
-            
-            st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+                with profiling.stage('avg_std_time_on_traffic'):
+                    figures.chart('Restaurantes.avg_std_time_on_traffic', state, avg_std_time_on_traffic, time_stats)
+
+finally:
+    # Painel e linha de log do perfil de desempenho (só com o perfil ligado), também quando a execução termina com
+    # erro ou é interrompida por um rerun:
+    profiling.finish()